@@ -0,0 +1,76 @@
+"""Layout + serialization time for synthetic topologies of growing size.
+
+Before timing, the malformed specs in MALFORMED (the kinds of mistakes model output makes,
+e.g. groups that contain each other) must lay out into diagrams the validator accepts as is.
+
+    python benchmarks/bench_layout.py --sizes 10 100 1000 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diagram.layout import topology_to_xml
+from diagram.styles import NODE_STYLES
+from diagram.validator import validate_and_repair
+
+MALFORMED = {
+    "group_cycle": {
+        "groups": [{"id": "g1", "label": "G1", "parent": "g2"}, {"id": "g2", "label": "G2", "parent": "g1"}],
+        "nodes": [{"id": "a", "label": "A", "parent": "g1"}, {"id": "b", "label": "B", "parent": "g2"}],
+        "edges": [["a", "b"]],
+    },
+    "group_own_parent": {
+        "groups": [{"id": "g", "label": "G", "parent": "g"}],
+        "nodes": [{"id": "a", "label": "A", "parent": "g"}, {"id": "b", "label": "B"}],
+        "edges": [["a", "b"]],
+    },
+}
+
+
+def synthetic_topology(n, seed=0, group_size=25):
+    # Layered architecture: nodes spread over groups (two levels deep), mostly forward edges.
+    rng = random.Random(seed)
+    layers = [{"id": "l0", "name": "Services"}, {"id": "l1", "name": "Data"}]
+    groups, nodes, edges = [], [], []
+    for g in range(max(1, n // group_size)):
+        parent = layers[g % 2]["id"] if g % 4 < 2 else f"g{g - 2}"
+        groups.append({"id": f"g{g}", "label": f"Group {g}", "parent": parent})
+    for i in range(n):
+        nodes.append({"id": f"n{i}", "label": f"Service {i}", "style": rng.choice(NODE_STYLES),
+                      "parent": f"g{rng.randrange(len(groups))}"})
+        if i:
+            edges.append([f"n{rng.randrange(i)}", f"n{i}"])
+        if i > 2 and rng.random() < 0.3:
+            edges.append([f"n{i}", f"n{rng.randrange(i)}"])
+    return {"layers": layers, "groups": groups, "nodes": nodes, "edges": edges}
+
+
+def check_malformed():
+    for name, spec in MALFORMED.items():
+        xml = topology_to_xml(spec)
+        report = validate_and_repair(xml)
+        cells = xml.count('vertex="1"'), xml.count('edge="1"')
+        expected = len(spec["groups"]) + len(spec["nodes"]), len(spec["edges"])
+        assert report.ok and not report.fixes and cells == expected, (name, report.errors, report.fixes, cells)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    args = parser.parse_args()
+    check_malformed()
+    print(f"{'nodes':>8}{'edges':>8}{'layout+xml':>14}{'xml size':>12}")
+    for n in args.sizes:
+        spec = synthetic_topology(n)
+        start = time.perf_counter()
+        xml = topology_to_xml(spec)
+        elapsed = 1000 * (time.perf_counter() - start)
+        print(f"{n:>8}{len(spec['edges']):>8}{elapsed:>12.1f}ms{len(xml) // 1024:>10}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Per-request setup overhead of generate_xml, before and after the registry.
+
+Both arms run the same graph (server.build_graph) through the same async pipeline, with the
+offline fake LLM, one shared MemorySaver and a fresh thread id per request. "before" drops
+the registry before every request, so the graph is compiled and the prompt templates and
+LLM clients are built again, as every request used to do; "after" reuses them. The
+difference is the setup cost the registry saves. Run from the repo root:
+
+    python benchmarks/bench_overhead.py --runs 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("RESULT_CACHE_DIR", "")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from langgraph.checkpoint.memory import MemorySaver
+
+import server
+from pipeline import registry
+from pipeline.providers import FakeChatModel
+
+_loop = asyncio.new_event_loop()
+_checkpointer = MemorySaver()
+
+
+def request(prompt):
+    graph = registry.get_graph("bench", server.build_graph, _checkpointer)
+    state = server.WorkflowState(user_prompt=prompt, use_cache=False)
+    return _loop.run_until_complete(graph.ainvoke(state, {"configurable": {"thread_id": uuid.uuid4().hex}}))
+
+
+def rebuilt_request(prompt):
+    registry.clear()
+    return request(prompt)
+
+
+def measure(fn, runs):
+    fn("warm up")
+    samples = []
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(f"prompt {i}")
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "mean_ms": 1000 * sum(samples) / len(samples),
+        "p50_ms": 1000 * samples[len(samples) // 2],
+        "p95_ms": 1000 * samples[int(len(samples) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=100)
+    args = parser.parse_args()
+
+    registry.set_llm_factory(lambda model: FakeChatModel(model=model))
+    before = measure(rebuilt_request, args.runs)
+    after = measure(request, args.runs)
+
+    print(f"{'':10}{'mean':>10}{'p50':>10}{'p95':>10}")
+    for label, stats in (("before", before), ("after", after)):
+        print(f"{label:10}{stats['mean_ms']:>9.2f}ms{stats['p50_ms']:>8.2f}ms{stats['p95_ms']:>8.2f}ms")
+    print(f"setup saved per request: {before['mean_ms'] - after['mean_ms']:.2f}ms")
+    print(f"speedup: {before['mean_ms'] / after['mean_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Serialization time and output size for compact diagrams of growing size.
+
+    python benchmarks/bench_serializer.py --sizes 100 1000 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_layout import synthetic_topology
+from diagram.layout import build_diagram
+from diagram.model import to_xml, to_mxfile
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return 1000 * (time.perf_counter() - start), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+    print(f"{'nodes':>8}{'cells':>8}{'to_xml':>12}{'xml size':>11}{'to_mxfile':>12}{'mxfile size':>13}")
+    for n in args.sizes:
+        diagram = build_diagram(synthetic_topology(n))
+        xml_ms, xml = timed(to_xml, diagram)
+        packed_ms, packed = timed(to_mxfile, diagram)
+        print(f"{n:>8}{len(diagram):>8}{xml_ms:>10.1f}ms{len(xml) // 1024:>9}KB"
+              f"{packed_ms:>10.1f}ms{len(packed) // 1024:>11}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Cold start of the server and per-prompt overhead of the MCP client.
+
+Every server measurement runs in a fresh interpreter, the way a container scaled from zero
+starts, against the deterministic fake LLM:
+
+    import       python -c "import server": what runs before the server can listen
+    first        import plus the first generate_xml, including graph compilation and the
+                 LLM clients
+    loaded       which heavy packages the import alone pulled in
+
+With --client it also starts `python server.py` and times how long it takes to listen and to
+return the first diagram, with and without STARTUP_WARM_UP, then a cheap tool call over a
+fresh session per call (what client.py did on every prompt) against one cached MCPConnection:
+
+    python benchmarks/bench_startup.py --runs 5 --client
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+HEAVY = ("langgraph", "langgraph.checkpoint.memory", "langchain_core.prompts", "langchain_core.language_models",
+         "langchain_google_genai", "langchain_groq", "langchain_mcp_adapters")
+
+FIRST_REQUEST = """
+import asyncio, json
+import server
+data = json.loads(asyncio.run(server.generate_xml("user login flow", filename="startup")))
+assert "error" not in data, data
+"""
+
+LOADED = """
+import sys
+import server
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def environment():
+    home = tempfile.mkdtemp()
+    os.makedirs(os.path.join(home, "Downloads"))
+    return {
+        **os.environ,
+        "HOME": home,
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY": "0",
+        "RESULT_CACHE_DIR": "",
+        "ARTIFACT_STORE": "memory",
+        "LOG_LEVEL": "WARNING",
+    }
+
+
+def run_ms(code, env):
+    # Wall time of a whole interpreter, start-up included.
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True, capture_output=True)
+    return 1000 * (time.perf_counter() - start)
+
+
+def summary(samples):
+    return {"min_ms": min(samples), "median_ms": statistics.median(samples)}
+
+
+def bench_server(runs):
+    env = environment()
+    run_ms("pass", env)  # warm the filesystem cache
+    results = {
+        "python": summary([run_ms("pass", env) for _ in range(runs)]),
+        "import": summary([run_ms("import server", env) for _ in range(runs)]),
+        "first": summary([run_ms(FIRST_REQUEST, env) for _ in range(runs)]),
+    }
+    loaded = subprocess.run([sys.executable, "-c", LOADED.format(heavy=HEAVY)], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True).stdout.strip()
+    return results, loaded.split(",") if loaded else []
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.05)
+    raise TimeoutError(f"server did not listen on {port}")
+
+
+def timed(fn, calls):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        samples.append(1000 * (time.perf_counter() - start))
+    return summary(samples)
+
+
+def start_server(env):
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "server.py"], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(8000)
+    return server, 1000 * (time.perf_counter() - start)
+
+
+def stop_server(server):
+    server.terminate()
+    server.wait()
+
+
+def bench_client(runs, calls):
+    from pipeline.mcp_client import MCPConnection, call_once
+
+    url = "http://127.0.0.1:8000/mcp/"
+    results = {}
+    # Time to listen, and to the first diagram sent right after, with and without STARTUP_WARM_UP.
+    for warm_up in ("0", "1"):
+        listen, first = [], []
+        for _ in range(runs):
+            server, listen_ms = start_server({**environment(), "STARTUP_WARM_UP": warm_up})
+            try:
+                start = time.perf_counter()
+                call_once("generate_xml", {"input": "user login flow", "filename": "startup"}, url)
+                first.append(listen_ms + 1000 * (time.perf_counter() - start))
+                listen.append(listen_ms)
+            finally:
+                stop_server(server)
+        results[f"listen_warm_up_{warm_up}"] = summary(listen)
+        results[f"first_diagram_warm_up_{warm_up}"] = summary(first)
+
+    server, _ = start_server(environment())
+    try:
+        results["session_per_call"] = timed(lambda: call_once("token_report", {}, url), calls)
+        connection = MCPConnection(url)
+        connection.call("token_report", {})  # the one handshake the cached session pays
+        results["cached_session"] = timed(lambda: connection.call("token_report", {}), calls)
+        connection.close()
+    finally:
+        stop_server(server)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--client", action="store_true", help="also time MCP client calls against a local server")
+    parser.add_argument("--calls", type=int, default=20, help="tool calls per client measurement")
+    args = parser.parse_args()
+
+    results, loaded = bench_server(args.runs)
+    if args.client:
+        results.update(bench_client(args.runs, args.calls))
+    print(f"{'':28}{'min':>10}{'median':>10}")
+    for label, stats in results.items():
+        print(f"{label:28}{stats['min_ms']:>8.1f}ms{stats['median_ms']:>8.1f}ms")
+    print(f"heavy modules loaded by import: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
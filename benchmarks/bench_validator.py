@@ -0,0 +1,50 @@
+"""Run the local validator over the broken-diagram corpus and report timings.
+
+Every file in benchmarks/corpus is a diagram with one class of mistake the verify
+prompt asks the LLM to fix; the report shows which ones are repaired locally and
+which still fall through to the LLM fixer. corpus/expected.json records the outcome and
+the exact fixes and errors expected for each file; any difference fails the run.
+
+    python benchmarks/bench_validator.py
+"""
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diagram.validator import validate_and_repair
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+def main():
+    with open(os.path.join(CORPUS, "expected.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    local = 0
+    mismatches = []
+    paths = sorted(glob.glob(os.path.join(CORPUS, "*.drawio")))
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            xml = f.read()
+        start = time.perf_counter()
+        report = validate_and_repair(xml)
+        elapsed = 1000 * (time.perf_counter() - start)
+        if report.ok:
+            local += 1
+            # A repaired diagram must be a fixed point of the validator.
+            assert not validate_and_repair(report.xml).fixes, path
+        outcome = "local" if report.ok else "llm"
+        name = os.path.basename(path)
+        print(f"{name:32}{outcome:>7}{elapsed:>9.2f}ms  {'; '.join(report.errors or report.fixes)}")
+        if expected.get(name) != {"outcome": outcome, "fixes": report.fixes, "errors": report.errors}:
+            mismatches.append(name)
+    print(f"\n{local}/{len(paths)} diagrams repaired without an LLM call")
+    if mismatches:
+        sys.exit(f"unexpected validator results for: {', '.join(mismatches)} (see corpus/expected.json)")
+
+
+if __name__ == "__main__":
+    main()
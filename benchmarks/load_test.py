@@ -0,0 +1,85 @@
+"""Load test for the async generate_xml tool against a fake LLM with injected latency.
+
+Fires batches of concurrent generate_xml calls and reports throughput per
+concurrency level, so the effect of MAX_CONCURRENT_REQUESTS / MAX_QUEUED_REQUESTS
+can be checked without provider keys:
+
+    MAX_CONCURRENT_REQUESTS=8 python benchmarks/load_test.py --latency 0.2 --levels 1 2 4 8 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ.setdefault("GOOGLE_API_KEY", "stub")
+# Every request must reach the pipeline: no result cache on disk, and use_cache=False below.
+os.environ["RESULT_CACHE_DIR"] = ""
+# Keep the tool's ~/Downloads writes inside a scratch directory.
+os.environ["HOME"] = tempfile.mkdtemp()
+os.makedirs(os.path.join(os.environ["HOME"], "Downloads"))
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+import server
+from pipeline import registry
+
+STUB_XML = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "valid.drawio")).read()
+
+
+def fake_llm(latency):
+    async def respond(prompt_value):
+        await asyncio.sleep(latency)
+        return AIMessage(content=STUB_XML)
+
+    return lambda model=None: RunnableLambda(respond)
+
+
+async def run_level(concurrency, requests):
+    latencies = []
+
+    async def one(i):
+        start = time.perf_counter()
+        # Prompts are unique per level too, so no level is served from an earlier one's results.
+        result = json.loads(await server.generate_xml(f"diagram {concurrency}-{i}", filename=f"load_{concurrency}_{i}", use_cache=False))
+        latencies.append(time.perf_counter() - start)
+        return "error" not in result
+
+    start = time.perf_counter()
+    outcomes = []
+    for offset in range(0, requests, concurrency):
+        outcomes += await asyncio.gather(*(one(i) for i in range(offset, min(offset + concurrency, requests))))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "ok": sum(outcomes),
+        "rejected": len(outcomes) - sum(outcomes),
+        "throughput": len(outcomes) / wall,
+        "p50_ms": 1000 * latencies[len(latencies) // 2],
+        "p95_ms": 1000 * latencies[max(0, int(len(latencies) * 0.95) - 1)],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.1, help="fake LLM latency per call, seconds")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    registry.set_llm_factory(fake_llm(args.latency))
+    print(f"limiter: {server.limiter.max_concurrency} running, {server.limiter.max_queue} queued")
+    print(f"{'callers':>8}{'ok':>6}{'busy':>6}{'req/s':>9}{'p50':>11}{'p95':>11}")
+    for level in args.levels:
+        r = await run_level(level, args.requests)
+        print(f"{r['concurrency']:>8}{r['ok']:>6}{r['rejected']:>6}{r['throughput']:>9.2f}{r['p50_ms']:>9.0f}ms{r['p95_ms']:>9.0f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,219 @@
+"""Offline benchmark suite: one comparable report for every performance change.
+
+Runs against the deterministic fake LLM (pipeline/providers.py), so no provider keys
+or network are needed:
+
+    python benchmarks/suite.py --output before.json
+    # ...change something...
+    python benchmarks/suite.py --output after.json --compare before.json
+
+Covers prompt sizes, server cold start, end-to-end generate_xml latency and prompt tokens, throughput under concurrency, memory per
+request, and layout/serializer/validator/SVG export speed on synthetic diagrams of 10 to 10,000 cells.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("RESULT_CACHE_DIR", "")
+# Keep the tool's ~/Downloads writes inside a scratch directory.
+os.environ["HOME"] = tempfile.mkdtemp()
+os.makedirs(os.path.join(os.environ["HOME"], "Downloads"))
+
+import server
+from benchmarks.bench_layout import synthetic_topology
+from benchmarks.bench_startup import bench_server
+from diagram.layout import build_diagram
+from diagram.model import to_xml, to_mxfile
+from diagram.render import to_svg
+from diagram.validator import validate_and_repair
+from pipeline import registry, metrics, tokens
+from pipeline.providers import FakeChatModel
+
+# Metrics where a bigger number is better; everything else is a cost.
+HIGHER_IS_BETTER = ("throughput",)
+# A mix of what the start router sees: short, structured and free-form prompts.
+PROMPTS = [
+    "user login flow",
+    "- web app\n- api gateway\n- orders service\n- postgres\nweb -> api -> orders -> postgres",
+    "Create a workflow showing user login with email and password, verification through an OTP service, and a redirect to the dashboard",
+    "three tier web architecture with a cache",
+]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def one_request(i, tag):
+    start = time.perf_counter()
+    prompt = f"{PROMPTS[i % len(PROMPTS)]} #{i}"
+    result = json.loads(await server.generate_xml(prompt, filename=f"{tag}_{i}", use_cache=False))
+    return time.perf_counter() - start, "error" not in result
+
+
+async def bench_end_to_end(runs):
+    calls = metrics.LLM_CALLS.total()
+    before = metrics.LLM_TOKENS.totals("kind")
+    samples = [await one_request(i, "e2e") for i in range(runs)]
+    calls = metrics.LLM_CALLS.total() - calls
+    used = {kind: value - before.get(kind, 0) for kind, value in metrics.LLM_TOKENS.totals("kind").items()}
+    latencies = [s for s, ok in samples if ok]
+    return {
+        "e2e.ok": len(latencies),
+        "e2e.llm_calls_per_request": calls / runs,
+        "e2e.prompt_tokens_per_request": used.get(("prompt",), 0) / runs,
+        "e2e.uncached_prompt_tokens_per_request": (used.get(("prompt",), 0) - used.get(("cached_prompt",), 0)) / runs,
+        "e2e.mean_ms": 1000 * statistics.mean(latencies),
+        "e2e.p50_ms": 1000 * percentile(latencies, 0.5),
+        "e2e.p95_ms": 1000 * percentile(latencies, 0.95),
+    }
+
+
+async def bench_throughput(levels, requests):
+    results = {}
+    for level in levels:
+        start = time.perf_counter()
+        outcomes = []
+        for offset in range(0, requests, level):
+            batch = range(offset, min(offset + level, requests))
+            outcomes += await asyncio.gather(*(one_request(i, f"tp{level}") for i in batch))
+        wall = time.perf_counter() - start
+        results[f"throughput.c{level}_rps"] = sum(ok for _, ok in outcomes) / wall
+        results[f"latency.c{level}_p95_ms"] = 1000 * percentile([s for s, _ in outcomes], 0.95)
+    return results
+
+
+async def bench_memory(concurrency):
+    # Python-heap peak while `concurrency` requests are in flight, per request.
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    await asyncio.gather(*(one_request(i, "mem") for i in range(concurrency)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "memory.peak_kib_per_request": (peak - base) / 1024 / concurrency,
+        "memory.max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def bench_prompts():
+    # Static prompt size per stage: the floor every call to that stage pays.
+    return {f"prompt.{stage}_tokens": size["system_tokens"] + size["template_tokens"] for stage, size in tokens.prompt_sizes().items()}
+
+
+def bench_startup(runs):
+    # Fresh interpreters: `import server`, and import plus the first generate_xml.
+    results, _ = bench_server(runs)
+    return {"startup.import_ms": results["import"]["median_ms"], "startup.first_request_ms": results["first"]["median_ms"]}
+
+
+def timed_ms(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return 1000 * best
+
+
+def bench_diagrams(sizes):
+    results = {}
+    for cells in sizes:
+        # synthetic_topology produces about 2.34 cells (nodes, groups, edges) per node.
+        spec = synthetic_topology(max(2, round(cells / 2.34)))
+        diagram = build_diagram(spec)
+        xml = to_xml(diagram)
+        key = f"cells{cells}"
+        results[f"{key}.actual_cells"] = len(diagram)
+        results[f"{key}.layout_ms"] = timed_ms(build_diagram, spec)
+        results[f"{key}.to_xml_ms"] = timed_ms(to_xml, diagram)
+        results[f"{key}.to_mxfile_ms"] = timed_ms(to_mxfile, diagram)
+        results[f"{key}.validate_ms"] = timed_ms(validate_and_repair, xml)
+        results[f"{key}.svg_ms"] = timed_ms(to_svg, xml)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, baseline):
+    print(f"\n{'metric':<36}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, value in results.items():
+        old = baseline.get(name)
+        if not isinstance(old, (int, float)) or name.endswith((".ok", ".actual_cells")):
+            continue
+        change = (value - old) / old * 100 if old else 0.0
+        better = change > 0 if name.startswith(HIGHER_IS_BETTER) else change < 0
+        mark = "" if abs(change) < 5 else (" better" if better else " WORSE")
+        print(f"{name:<36}{old:>12.2f}{value:>12.2f}{change:>9.1f}%{mark}")
+
+
+async def run(args):
+    registry.set_llm_factory(lambda model: FakeChatModel(model=model, latency=args.latency, nodes=args.nodes))
+    results = bench_prompts()
+    results.update(bench_startup(args.startup_runs))
+    results.update(await bench_end_to_end(args.runs))
+    results.update(await bench_throughput(args.levels, args.requests))
+    results.update(await bench_memory(args.memory_concurrency))
+    results.update(bench_diagrams(args.sizes))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.05, help="fake LLM latency per call, seconds")
+    parser.add_argument("--nodes", type=int, default=12, help="components in each fake diagram")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--startup-runs", type=int, default=3, help="fresh interpreters per startup measurement")
+    parser.add_argument("--memory-concurrency", type=int, default=8)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--compare", help="a previous report to diff against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    for name, value in results.items():
+        print(f"{name:<36}{value:>12.2f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"]["settings"] != report["meta"]["settings"]:
+            print("\nwarning: baseline was run with different settings")
+        compare(results, baseline["results"])
+
+
+if __name__ == "__main__":
+    main()
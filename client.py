@@ -1,36 +1,127 @@
 import streamlit as st
-import asyncio
 import json
-import os
 import uuid
-from mcp import ClientSession
-from mcp.client.streamable_http import streamablehttp_client
-from langchain_mcp_adapters.tools import load_mcp_tools
+import streamlit.components.v1 as components
+import html
 import traceback
+from diagram.model import decompress_diagram
+from pipeline.mcp_client import MCPConnection
 
 st.set_page_config(layout="wide")
 st.title("DrawIO Diagram Generator")
 
-if user_prompt := st.chat_input("Describe what you want to add to the diagram..."):
+GRAPH_HEADER = '<mxGraphModel background="#000000"><root>'
+GRAPH_FOOTER = '</root></mxGraphModel>'
+
+
+def render_diagram(placeholder, cells):
+    # Render the cells received so far with the diagrams.net viewer.
+    render_xml(placeholder, GRAPH_HEADER + "".join(cells) + GRAPH_FOOTER)
+
+
+def render_xml(placeholder, xml):
+    config = json.dumps({"xml": xml, "nav": True, "resize": True})
+    with placeholder.container():
+        components.html(
+            f'<div class="mxgraph" data-mxgraph="{html.escape(config)}"></div>'
+            '<script src="https://viewer.diagrams.net/js/viewer-static.min.js"></script>',
+            height=500,
+            scrolling=True,
+        )
+
+def show_result(placeholder, data, name):
+    # Tools are called with output="deflate", so the diagram arrives in the response and no
+    # filesystem has to be shared with the server. Later edits refer to it by its URI.
+    xml = decompress_diagram(data["xml_deflate"])
+    st.session_state["last_diagram"] = data["uri"]
+    st.session_state["last_diagram_name"] = name
+    render_xml(placeholder, xml)
+    st.download_button("Download .drawio", xml, file_name=name, mime="application/xml")
+
+
+@st.cache_resource
+def mcp_connection():
+    # One MCP session for the app's lifetime, shared by every rerun and browser tab, so a
+    # prompt no longer pays for a connection, handshake and tool discovery of its own.
+    return MCPConnection()
+
+
+with st.sidebar:
+    st.subheader("Batch")
+    batch_prompts = st.text_area("One diagram prompt per line")
+    if st.button("Generate all") and batch_prompts.strip():
+        prompts = [line.strip() for line in batch_prompts.splitlines() if line.strip()]
+        batch_status = st.empty()
+        done = []
+
+        def on_batch_progress(message):
+            update = json.loads(message or "{}")
+            if update.get("stage") != "batch":
+                return
+            done.append(update)
+            batch_status.caption(f"{len(done)}/{len(prompts)} diagrams done")
+
+        try:
+            result = mcp_connection().call(
+                "generate_xml_batch",
+                {"inputs": prompts, "filename_prefix": f"batch_{uuid.uuid4().hex[:8]}"},
+                on_progress=on_batch_progress,
+            )
+            for item in sorted(json.loads(result)["results"], key=lambda r: r["index"]):
+                if "error" in item:
+                    st.error(f"{item['input']}: {item['error']}")
+                else:
+                    st.success(f"{item['input']}: {item.get('drawio_path') or item['uri']}")
+        except Exception as e:
+            st.error("Batch failed:")
+            st.text(traceback.format_exc())
+
+# Follow-up prompts patch the last diagram (edit_diagram) instead of regenerating it.
+last_diagram = st.session_state.get("last_diagram")
+edit_last = bool(last_diagram) and st.toggle(f"Edit {st.session_state.get('last_diagram_name', 'diagram')}", value=True)
+
+if edit_last and (user_prompt := st.chat_input("Describe what you want to change in the diagram...")):
     st.chat_message("human").write(user_prompt)
+    try:
+        result = mcp_connection().call("edit_diagram", {"path": last_diagram, "change": user_prompt, "output": "deflate"})
+        data = json.loads(result)
+        if "error" in data:
+            st.error(f"Tool Error: {data['error']}")
+        else:
+            name = st.session_state.get("last_diagram_name", "diagram.drawio")
+            st.chat_message("ai").write(
+                f"Updated {name}: {data['added_cells']} cells and "
+                f"{data['added_edges']} edges added, {data['removed']} removed, {data['updated']} updated."
+            )
+            show_result(st.empty(), data, name)
+    except Exception as e:
+        st.error("Failed to edit the diagram:")
+        st.text(traceback.format_exc())
+
+elif not edit_last and (user_prompt := st.chat_input("Describe what you want to add to the diagram...")):
+    st.chat_message("human").write(user_prompt)
+
+    status = st.empty()
+    preview = st.empty()
+    partial = {"attempt": None, "cells": []}
 
-    async def call_mcp(prompt):
-        async with streamablehttp_client("http://127.0.0.1:8000/mcp/") as (read, write, _):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                tool_list = await load_mcp_tools(session)
-                tools = {tool.name: tool for tool in tool_list}
-
-                generate_xml = tools["generate_xml"]
-                filename = f"diagram_{uuid.uuid4().hex[:8]}"
-                
-                return await generate_xml.ainvoke({
-                    "input": prompt,
-                    "filename": filename
-                })
+    def on_progress(message):
+        update = json.loads(message or "{}")
+        if "cell" not in update:
+            return
+        if update["attempt"] != partial["attempt"]:
+            partial["attempt"], partial["cells"] = update["attempt"], []
+        partial["cells"].append(update["cell"])
+        status.caption(f"Generating... {update['cells']} cells (attempt {update['attempt']})")
+        render_diagram(preview, partial["cells"])
 
     try:
-        result = asyncio.run(call_mcp(user_prompt))
+        filename = f"diagram_{uuid.uuid4().hex[:8]}"
+        result = mcp_connection().call(
+            "generate_xml",
+            {"input": user_prompt, "filename": filename, "output": "deflate"},
+            on_progress=on_progress,
+        )
 
         print("=== Raw result from MCP ===")
         print(result)
@@ -48,8 +139,10 @@ if user_prompt := st.chat_input("Describe what you want to add to the diagram...
             st.text(json.dumps(data, indent=2))
             st.stop()
 
-        drawio_path = data.get("drawio_path")
-        st.chat_message("ai").write("Your diagram has been generated and saved to your Downloads folder.")
+        status.empty()
+        saved = f" and saved to {data['drawio_path']}" if data.get("drawio_path") else ""
+        st.chat_message("ai").write(f"Your diagram has been generated{saved}.")
+        show_result(preview, data, f"{filename}.drawio")
 
 
     except Exception as e:
@@ -0,0 +1,289 @@
+import json
+import re
+from collections import defaultdict, deque
+
+from diagram.styles import NODE_STYLES
+from diagram.model import Diagram, STYLE_IDS, GROUP, to_xml
+
+# Deterministic layout for the compact topology the LLM emits in "topology" mode:
+#
+#   {"direction": "LR",
+#    "layers": [{"id": "app", "name": "Application"}],
+#    "groups": [{"id": "backend", "label": "Backend", "parent": "app"}],
+#    "nodes":  [{"id": "api", "label": "API", "style": "Logic/Modules", "parent": "backend"}],
+#    "edges":  [["user", "api"], {"source": "api", "target": "db"}]}
+#
+# Every container (a group, or the shared canvas of the layers) is laid out with a
+# layered, Sugiyama-style pass over its direct children: cycle removal, longest-path
+# ranking, barycenter ordering, then coordinates with fixed spacing. Groups are sized
+# bottom-up so they enclose their children with GROUP_PADDING on every side.
+
+NODE_SIZE = (120, 60)
+MAX_NODE_WIDTH = 240
+SPACING = 50
+GROUP_PADDING = 20
+CANVAS_MARGIN = 40
+ORDERING_SWEEPS = 4
+ROOT = None
+
+_FENCE = re.compile(r"^\s*```[\w-]*\s*|\s*```\s*$")
+_STYLE_NAMES = {name.casefold(): name for name in NODE_STYLES}
+
+
+def parse_topology(text):
+    """Parse the model's topology JSON (tolerating markdown fences); raises ValueError."""
+    text = _FENCE.sub("", (text or "").strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("no JSON object in topology output")
+    spec = json.loads(text[start:end + 1])
+    if not isinstance(spec, dict) or not spec.get("nodes"):
+        raise ValueError("topology has no nodes")
+    return spec
+
+
+def _node_size(label):
+    width = min(MAX_NODE_WIDTH, max(NODE_SIZE[0], 8 * len(label) + 20))
+    return [width, NODE_SIZE[1]]
+
+
+def _edge_pairs(spec):
+    for edge in spec.get("edges", ()):
+        if isinstance(edge, dict):
+            yield str(edge.get("source")), str(edge.get("target"))
+        elif isinstance(edge, (list, tuple)) and len(edge) >= 2:
+            yield str(edge[0]), str(edge[1])
+
+
+def _rank(items, edges):
+    # Break cycles by reversing DFS back edges, then longest-path ranking.
+    succ = defaultdict(list)
+    for a, b in edges:
+        succ[a].append(b)
+    state, dag = {}, []
+    for root in items:
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(succ[root]))]
+        while stack:
+            node, it = stack[-1]
+            child = next(it, None)
+            if child is None:
+                state[node] = 2
+                stack.pop()
+            elif state.get(child) == 1:
+                dag.append((child, node))
+            else:
+                dag.append((node, child))
+                if child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(succ[child])))
+    out, indegree = defaultdict(list), {i: 0 for i in items}
+    for a, b in set(dag):
+        out[a].append(b)
+        indegree[b] += 1
+    rank = {i: 0 for i in items}
+    queue = deque(i for i in items if indegree[i] == 0)
+    while queue:
+        node = queue.popleft()
+        for child in out[node]:
+            rank[child] = max(rank[child], rank[node] + 1)
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                queue.append(child)
+    return rank
+
+
+def _order(items, edges, rank):
+    ranks = defaultdict(list)
+    for item in items:
+        ranks[rank[item]].append(item)
+    levels = [ranks[r] for r in sorted(ranks)]
+    neighbours = defaultdict(list)
+    for a, b in edges:
+        if rank[a] != rank[b]:
+            neighbours[a].append(b)
+            neighbours[b].append(a)
+    position = {item: i for level in levels for i, item in enumerate(level)}
+    for sweep in range(ORDERING_SWEEPS):
+        forward = sweep % 2 == 0
+        sequence = levels[1:] if forward else levels[-2::-1]
+        for level in sequence:
+            r = rank[level[0]]
+            def barycenter(item):
+                fixed = [position[n] for n in neighbours[item] if (rank[n] < r if forward else rank[n] > r)]
+                return sum(fixed) / len(fixed) if fixed else position[item]
+            level.sort(key=barycenter)
+            for i, item in enumerate(level):
+                position[item] = i
+    return levels
+
+
+def _place(levels, size, direction):
+    # Returns positions relative to the container's content box and its total extent.
+    across = 0 if direction == "LR" else 1  # axis along which ranks advance
+    along = 1 - across
+    extents = [sum(size[i][along] for i in level) + SPACING * (len(level) - 1) for level in levels]
+    tallest = max(extents)
+    pos, offset = {}, 0
+    for level, extent in zip(levels, extents):
+        thickness = max(size[i][across] for i in level)
+        cursor = (tallest - extent) // 2
+        for item in level:
+            p = [0, 0]
+            p[across] = offset + (thickness - size[item][across]) // 2
+            p[along] = cursor
+            pos[item] = p
+            cursor += size[item][along] + SPACING
+        offset += thickness + SPACING
+    total = [0, 0]
+    total[across] = offset - SPACING
+    total[along] = tallest
+    return pos, total
+
+
+def layout(spec):
+    """Compute geometry for a topology spec; returns {id: [x, y, width, height]} relative to each parent."""
+    direction = "TB" if str(spec.get("direction", "LR")).upper() == "TB" else "LR"
+    layers = {str(l["id"]) for l in spec.get("layers", ())}
+    groups = {str(g["id"]): g for g in spec.get("groups", ())}
+    nodes = {str(n["id"]): n for n in spec.get("nodes", ())}
+
+    # Containment among groups/nodes; anything hanging off a layer shares the root canvas.
+    container = {}
+    for key, item in list(groups.items()) + list(nodes.items()):
+        parent = str(item.get("parent")) if item.get("parent") is not None else None
+        container[key] = parent if parent in groups and parent != key else ROOT
+    for key in groups:
+        seen, node = {key}, container[key]
+        while node is not ROOT:
+            if node in seen:
+                container[key] = ROOT  # break containment cycles
+                break
+            seen.add(node)
+            node = container[node]
+
+    children = defaultdict(list)
+    for key in list(groups) + list(nodes):
+        children[container[key]].append(key)
+
+    def chain(key):
+        path = [key]
+        while container[path[-1]] is not ROOT:
+            path.append(container[path[-1]])
+        return path[::-1]
+
+    # Project every edge onto the container where its endpoints' branches meet.
+    projected = defaultdict(set)
+    for s, t in _edge_pairs(spec):
+        if s not in container or t not in container or s == t:
+            continue
+        cs, ct = chain(s), chain(t)
+        depth = 0
+        while depth < min(len(cs), len(ct)) and cs[depth] == ct[depth]:
+            depth += 1
+        if depth == len(cs) or depth == len(ct):
+            continue  # one endpoint contains the other
+        owner = cs[depth - 1] if depth else ROOT
+        projected[owner].add((cs[depth], ct[depth]))
+
+    geometry = {key: [0, 0] + _node_size(str(item.get("label") or key)) for key, item in nodes.items()}
+
+    # Iterative post-order so deep nesting doesn't hit the recursion limit.
+    order, stack = [], [ROOT]
+    while stack:
+        owner = stack.pop()
+        order.append(owner)
+        stack.extend(c for c in children[owner] if c in groups)
+    for owner in reversed(order):
+        items = children[owner]
+        if not items:
+            if owner is not ROOT:
+                geometry[owner] = [0, 0] + list(NODE_SIZE)
+            continue
+        size = {item: geometry[item][2:] for item in items}
+        edges = projected[owner]
+        rank = _rank(items, edges)
+        pos, total = _place(_order(items, edges, rank), size, direction)
+        inset = GROUP_PADDING if owner is not ROOT else CANVAS_MARGIN
+        for item in items:
+            geometry[item][0] = pos[item][0] + inset
+            geometry[item][1] = pos[item][1] + inset
+        if owner is not ROOT:
+            geometry[owner] = [0, 0, total[0] + 2 * GROUP_PADDING, total[1] + 2 * GROUP_PADDING]
+    return geometry
+
+
+def build_diagram(spec):
+    """Lay out a topology spec into a compact Diagram."""
+    geometry = layout(spec)
+    layers = [l for l in spec.get("layers", ())]
+    if not layers:
+        layers = [{"id": "__default__", "name": "Diagram"}]
+    layer_ids = {str(l["id"]) for l in layers}
+    default_layer = str(layers[0]["id"])
+    items = {}
+    for kind in ("groups", "nodes"):
+        for item in spec.get(kind, ()):
+            items[str(item["id"])] = (kind, item)
+
+    def parent_of(key):
+        parent = items[key][1].get("parent")
+        parent = str(parent) if parent is not None else None
+        if parent in layer_ids or (parent in items and items[parent][0] == "groups" and parent != key):
+            return parent
+        return default_layer
+
+    # Break containment cycles the way layout() does, so the geometry it computed still applies.
+    parent = {key: parent_of(key) for key in items}
+    for key in items:
+        if items[key][0] != "groups":
+            continue
+        seen, node = {key}, parent[key]
+        while node in items:
+            if node in seen:
+                parent[key] = default_layer
+                break
+            seen.add(node)
+            node = parent[node]
+
+    diagram, ids = Diagram(), {}
+    for layer in layers:
+        ids[str(layer["id"])] = diagram.add_layer(str(layer.get("name") or layer["id"])).id
+
+    # Parents before children: walk the containment tree from the layers down.
+    children = defaultdict(list)
+    for key in items:
+        children[parent[key]].append(key)
+    stack = [str(l["id"]) for l in reversed(layers)]
+    while stack:
+        owner = stack.pop()
+        for key in children[owner]:
+            kind, item = items[key]
+            if kind == "groups":
+                style = GROUP
+            else:
+                style = STYLE_IDS[_STYLE_NAMES.get(str(item.get("style", "")).casefold(), "Logic/Modules")]
+            ids[key] = diagram.add_vertex(str(item.get("label") or key), style, ids[owner], *geometry[key]).id
+        stack.extend(reversed([k for k in children[owner] if items[k][0] == "groups"]))
+
+    def containers(key):
+        path = []
+        while key in items:
+            key = parent[key]
+            path.append(key)
+        return path
+
+    for s, t in _edge_pairs(spec):
+        if s not in items or t not in items:
+            continue
+        target_chain = containers(t)
+        common = next((c for c in containers(s) if c in target_chain), None)
+        diagram.add_edge(ids[s], ids[t], ids[common] if common else 1)
+    return diagram
+
+
+def topology_to_xml(spec):
+    """Lay out a topology spec and serialize it as a draw.io mxGraphModel."""
+    return to_xml(build_diagram(spec))
@@ -0,0 +1,155 @@
+import base64
+import zlib
+from dataclasses import dataclass
+from typing import List
+from urllib.parse import quote, unquote
+from xml.sax.saxutils import escape
+
+from diagram.styles import STYLES, GROUP_STYLE, EDGE_STYLE
+
+# Compact in-memory diagram: slotted records whose styles are small ints into STYLE_NAMES
+# instead of full style strings, and a serializer that streams draw.io XML in chunks
+# (optionally as a compressed <mxfile>) rather than building one big string by concatenation.
+
+STYLE_NAMES = list(STYLES)
+STYLE_IDS = {name: i for i, name in enumerate(STYLE_NAMES)}
+_STYLE_STRINGS = [STYLES[name] for name in STYLE_NAMES]
+GROUP = STYLE_IDS[GROUP_STYLE]
+EDGE = STYLE_IDS[EDGE_STYLE]
+
+HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+MODEL_OPEN = ('<mxGraphModel dx="1434" dy="784" grid="1" gridSize="10" guides="1" tooltips="1" connect="1" '
+              'arrows="1" fold="1" page="1" pageScale="1" pageWidth="850" pageHeight="1100" background="#000000">\n'
+              '<root>\n<mxCell id="0"/>\n<mxCell id="1" parent="0"/>\n')
+MODEL_CLOSE = "</root>\n</mxGraphModel>"
+_ATTR_ENTITIES = {'"': "&quot;", "\n": "&#10;"}
+
+
+@dataclass(slots=True)
+class Layer:
+    id: int
+    name: str
+    visible: bool = True
+
+
+@dataclass(slots=True)
+class Vertex:
+    # Nodes and groups; groups carry style GROUP.
+    id: int
+    label: str
+    style: int
+    parent: int
+    x: int = 0
+    y: int = 0
+    width: int = 120
+    height: int = 60
+
+
+@dataclass(slots=True)
+class Edge:
+    id: int
+    source: int
+    target: int
+    parent: int = 1
+
+
+class Diagram:
+    """Cells in id order: layers first, then vertices (parents before children), then edges."""
+
+    __slots__ = ("layers", "vertices", "edges", "_next_id")
+
+    def __init__(self):
+        self.layers: List[Layer] = []
+        self.vertices: List[Vertex] = []
+        self.edges: List[Edge] = []
+        self._next_id = 2
+
+    def _allocate(self):
+        self._next_id += 1
+        return self._next_id - 1
+
+    def add_layer(self, name, visible=True):
+        layer = Layer(self._allocate(), name, visible)
+        self.layers.append(layer)
+        return layer
+
+    def add_vertex(self, label, style, parent, x=0, y=0, width=120, height=60):
+        style = style if isinstance(style, int) else STYLE_IDS[style]
+        vertex = Vertex(self._allocate(), label, style, parent, x, y, width, height)
+        self.vertices.append(vertex)
+        return vertex
+
+    def add_edge(self, source, target, parent=1):
+        edge = Edge(self._allocate(), source, target, parent)
+        self.edges.append(edge)
+        return edge
+
+    def __len__(self):
+        return len(self.layers) + len(self.vertices) + len(self.edges)
+
+
+def _attr(value):
+    return escape(value, _ATTR_ENTITIES)
+
+
+def iter_xml(diagram, header=True, chunk_cells=256):
+    """Yield the mxGraphModel XML for `diagram` in chunks of about `chunk_cells` cells."""
+    if header:
+        yield HEADER
+    yield MODEL_OPEN
+    buffer = []
+    for layer in diagram.layers:
+        name = _attr(layer.name)
+        buffer.append(f'<mxCell id="{layer.id}" value="{name}" style="layer;name={name};visible={int(layer.visible)};" parent="1">\n'
+                      '  <mxGeometry x="0" y="0" width="0" height="0" as="geometry"/>\n</mxCell>\n')
+    for v in diagram.vertices:
+        buffer.append(f'<mxCell id="{v.id}" value="{_attr(v.label)}" style="{_STYLE_STRINGS[v.style]}" vertex="1" parent="{v.parent}">\n'
+                      f'  <mxGeometry x="{v.x}" y="{v.y}" width="{v.width}" height="{v.height}" as="geometry"/>\n</mxCell>\n')
+        if len(buffer) >= chunk_cells:
+            yield "".join(buffer)
+            buffer.clear()
+    edge_style = _STYLE_STRINGS[EDGE]
+    for e in diagram.edges:
+        buffer.append(f'<mxCell id="{e.id}" value="" style="{edge_style}" edge="1" parent="{e.parent}" source="{e.source}" target="{e.target}">\n'
+                      '  <mxGeometry relative="1" as="geometry"/>\n</mxCell>\n')
+        if len(buffer) >= chunk_cells:
+            yield "".join(buffer)
+            buffer.clear()
+    if buffer:
+        yield "".join(buffer)
+    yield MODEL_CLOSE
+
+
+def to_xml(diagram):
+    return "".join(iter_xml(diagram))
+
+
+def write_xml(diagram, fp):
+    for chunk in iter_xml(diagram):
+        fp.write(chunk)
+
+
+# draw.io's compressed <diagram> payload: base64(raw deflate(encodeURIComponent(xml))).
+_URI_SAFE = "-_.!~*'()"
+
+
+def compress_chunks(chunks):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    parts = [compressor.compress(quote(chunk, safe=_URI_SAFE).encode("ascii")) for chunk in chunks]
+    parts.append(compressor.flush())
+    return base64.b64encode(b"".join(parts)).decode("ascii")
+
+
+def decompress_diagram(payload):
+    raw = zlib.decompress(base64.b64decode(payload.strip()), -15)
+    return unquote(raw.decode("ascii"))
+
+
+def to_mxfile(diagram, name="Page-1", compressed=True):
+    """Wrap the diagram in <mxfile><diagram>, deflate-compressed the way draw.io saves it."""
+    if compressed:
+        body = compress_chunks(iter_xml(diagram, header=False))
+    else:
+        body = "".join(iter_xml(diagram, header=False))
+    return (f'{HEADER}<mxfile host="drawio-mcp" compressed="{str(compressed).lower()}">'
+            f'<diagram id="page-1" name="{_attr(name)}">{body}</diagram></mxfile>')
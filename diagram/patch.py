@@ -0,0 +1,216 @@
+import json
+import re
+from collections import defaultdict
+
+from diagram.layout import layout, CANVAS_MARGIN, GROUP_PADDING, SPACING
+from diagram.styles import STYLES, GROUP_STYLE, EDGE_STYLE, NODE_STYLES, style_name
+from diagram.validator import Cell, serialize
+
+# Incremental edits to a saved diagram. The LLM sees `summarize(cells)` (one short line per
+# cell, no geometry or style strings) and answers with a JSON patch:
+#
+#   {"remove": ["12"], "update": [{"id": "5", "label": "Orders API"}],
+#    "groups": [{"id": "cache", "label": "Cache", "parent": "3"}],
+#    "nodes":  [{"id": "redis", "label": "Redis", "style": "Databases (Filled Red)", "parent": "cache"}],
+#    "edges":  [["5", "redis"]]}
+#
+# apply_patch keeps every surviving cell's id and geometry. New groups and nodes are laid
+# out by the layout engine and placed below the existing content of their container.
+
+_FENCE = re.compile(r"^\s*```[\w-]*\s*|\s*```\s*$")
+# Item types each patch list may hold: ids, change/new-cell objects, or [source, target] pairs.
+_ITEM_TYPES = {"remove": (str, int), "update": (dict,), "groups": (dict,), "nodes": (dict,), "edges": (dict, list)}
+
+
+def _number(value):
+    try:
+        return int(round(float(value)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _quote(text):
+    return json.dumps(text or "", ensure_ascii=False)
+
+
+def summarize(cells):
+    lines = []
+    for c in cells:
+        if c.id in ("0", "1"):
+            continue
+        if c.is_layer:
+            lines.append(f"layer {c.id} {_quote(c.value)}")
+        elif c.edge:
+            lines.append(f"edge {c.id}: {c.source} -> {c.target}")
+        else:
+            name = style_name(c.style)
+            if name == GROUP_STYLE:
+                lines.append(f"group {c.id} {_quote(c.value)} in {c.parent}")
+            else:
+                lines.append(f"node {c.id} {_quote(c.value)} [{name or 'Logic/Modules'}] in {c.parent}")
+    return "\n".join(lines)
+
+
+def parse_patch(text):
+    """Parse the model's JSON patch (tolerating markdown fences); raises ValueError."""
+    text = _FENCE.sub("", (text or "").strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("no JSON object in edit output")
+    patch = json.loads(text[start:end + 1])
+    if not isinstance(patch, dict):
+        raise ValueError("edit output is not a JSON object")
+    for key, types in _ITEM_TYPES.items():
+        items = patch.get(key, [])
+        if not isinstance(items, list) or not all(isinstance(i, types) and not isinstance(i, bool) for i in items):
+            raise ValueError(f"edit output {key!r} is not a list of {' or '.join(t.__name__ for t in types)}")
+    return patch
+
+
+def _edge_pairs(patch):
+    for edge in patch.get("edges", ()):
+        if isinstance(edge, dict):
+            yield str(edge.get("source")), str(edge.get("target"))
+        elif isinstance(edge, (list, tuple)) and len(edge) >= 2:
+            yield str(edge[0]), str(edge[1])
+
+
+def _node_style(name):
+    name = style_name(name or "")
+    return STYLES[name if name in NODE_STYLES else "Logic/Modules"]
+
+
+def apply_patch(model_attrs, cells, patch):
+    """Apply `patch` to parsed `cells`; returns (xml, counts). Run validate_and_repair(renumber=False) on the xml."""
+    by_id = {c.id: c for c in cells}
+    children = defaultdict(list)
+    for c in cells:
+        if not c.edge:
+            children[c.parent].append(c.id)
+
+    # Removals cascade to everything inside a removed container and to edges touching it.
+    removed = set()
+    stack = [str(i) for i in patch.get("remove", ()) if str(i) in by_id and str(i) not in ("0", "1")]
+    while stack:
+        cell_id = stack.pop()
+        if cell_id not in removed:
+            removed.add(cell_id)
+            stack.extend(children[cell_id])
+    for c in cells:
+        if c.edge and (c.source in removed or c.target in removed):
+            removed.add(c.id)
+
+    updated = 0
+    for change in patch.get("update", ()):
+        cell = by_id.get(str(change.get("id")))
+        if cell is None or cell.id in removed or cell.edge or cell.is_layer:
+            continue
+        if change.get("label"):
+            cell.value = str(change["label"])
+        if change.get("style") and style_name(cell.style) != GROUP_STYLE:
+            cell.style = _node_style(change["style"])
+        updated += 1
+
+    kept = [c for c in cells if c.id not in removed and c.id not in ("0", "1")]
+    existing = {c.id for c in kept}
+    containers = {c.id for c in kept if c.is_layer or (c.vertex and (style_name(c.style) == GROUP_STYLE or children[c.id]))}
+    layer_ids = {c.id for c in kept if c.is_layer}
+    default_parent = next((c.id for c in kept if c.is_layer), "1")
+
+    # New items, keyed by the model's ids; those ids only have to be unique within the patch.
+    new = {}
+    for kind in ("groups", "nodes"):
+        for item in patch.get(kind, ()):
+            key = str(item.get("id") or f"new{len(new)}")
+            if key in existing or key in new:
+                continue
+            new[key] = (kind, item)
+
+    def resolve_parent(key):
+        parent = str(new[key][1].get("parent"))
+        if parent in new and new[parent][0] == "groups" and parent != key:
+            return parent
+        return parent if parent in containers else default_parent
+
+    parent_of = {key: resolve_parent(key) for key in new}
+    for key in new:  # break containment cycles among new groups
+        seen, node = {key}, parent_of[key]
+        while node in new:
+            if node in seen:
+                parent_of[key] = default_parent
+                break
+            seen.add(node)
+            node = parent_of[node]
+
+    # Lay out each existing container's new subtree, then drop it below what is already there.
+    def anchor(key):
+        while key in new:
+            key = parent_of[key]
+        return key
+
+    pairs = [(s, t) for s, t in _edge_pairs(patch) if (s in new or s in existing) and (t in new or t in existing) and s != t]
+    geometry = {}
+    by_anchor = defaultdict(list)
+    for key in new:
+        by_anchor[anchor(key)].append(key)
+    for container, keys in by_anchor.items():
+        spec = {
+            "groups": [{"id": k, "label": new[k][1].get("label") or k, "parent": parent_of[k] if parent_of[k] in new else None}
+                       for k in keys if new[k][0] == "groups"],
+            "nodes": [{"id": k, "label": new[k][1].get("label") or k, "parent": parent_of[k] if parent_of[k] in new else None}
+                      for k in keys if new[k][0] == "nodes"],
+            "edges": [[s, t] for s, t in pairs if s in keys and t in keys],
+        }
+        placed = layout(spec)
+        if container in layer_ids:
+            # Layers share one canvas, so clear the content of every layer.
+            siblings = [c.geometry for c in kept if c.vertex and c.parent in layer_ids]
+        else:
+            siblings = [by_id[i].geometry for i in children[container] if i in existing]
+        if siblings:
+            left = min(_number(g.get("x")) for g in siblings)
+            top = max(_number(g.get("y")) + _number(g.get("height")) for g in siblings) + SPACING
+        elif container in existing and not by_id[container].is_layer:
+            left = top = GROUP_PADDING
+        else:
+            left = top = CANVAS_MARGIN
+        for key in keys:
+            x, y, w, h = placed[key]
+            if parent_of[key] not in new:
+                x, y = x - CANVAS_MARGIN + left, y - CANVAS_MARGIN + top
+            geometry[key] = {"x": x, "y": y, "width": w, "height": h}
+
+    next_id = max([_number(i) for i in by_id] + [1]) + 1
+    ids = {}
+    for key in new:
+        ids[key], next_id = str(next_id), next_id + 1
+
+    # Parents before children so the new cells can be appended in order.
+    added = []
+    pending = list(new)
+    emitted = set()
+    while pending:
+        key = pending.pop(0)
+        parent = parent_of[key]
+        if parent in new and parent not in emitted:
+            pending.append(key)
+            continue
+        kind, item = new[key]
+        style = STYLES[GROUP_STYLE] if kind == "groups" else _node_style(item.get("style"))
+        label = str(item.get("label") or key)
+        added.append(Cell(ids[key], label, style, ids.get(parent, parent), None, None, True, False, geometry[key], True))
+        emitted.add(key)
+
+    edges = []
+    for s, t in pairs:
+        source, target = ids.get(s, s), ids.get(t, t)
+        edges.append(Cell(str(next_id), "", STYLES[EDGE_STYLE], "1", source, target, False, True, {}, True))
+        next_id += 1
+
+    counts = {
+        "removed": len(removed),
+        "updated": updated,
+        "added_cells": len(added),
+        "added_edges": len(edges),
+    }
+    return serialize(model_attrs, kept + added + edges), counts
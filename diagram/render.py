@@ -0,0 +1,242 @@
+import html
+import re
+from xml.sax.saxutils import escape
+
+from diagram.styles import parse_style, style_shape
+from diagram.validator import parse
+
+# Native SVG rendering of a draw.io document, so exports need neither draw.io nor a
+# browser. It covers what this service generates: the shapes of the style list, fill,
+# stroke and font colours with opacity, dashed outlines, html labels (<br>, <small>) and
+# orthogonal edges between node perimeters. Vertex geometry is relative to the parent
+# vertex, as in mxGraph; cells in hidden layers are skipped. PNG goes through cairosvg,
+# an optional dependency.
+
+FORMATS = ("svg", "png")
+FONT_FAMILY = "Helvetica, Arial, sans-serif"
+FONT_SIZE = 12
+SMALL_FONT_SIZE = 10
+LINE_HEIGHT = 1.25
+MARGIN = 20
+LABEL_INSET = 6
+
+_TAG = re.compile(r"(<[^>]*>)")
+_BREAK = re.compile(r"<br\s*/?>", re.IGNORECASE)
+
+
+def _number(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _fmt(value):
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _attr(value):
+    return escape(str(value), {'"': "&quot;"})
+
+
+def _label_lines(value):
+    # [[(text, small), ...], ...]: one list of runs per line of the html label.
+    lines, runs, small = [], [], False
+    for part in _TAG.split(_BREAK.sub("\n", value or "")):
+        if part.startswith("<"):
+            tag = part.strip("</> ").split()[0].lower() if part.strip("</> ") else ""
+            if tag == "small":
+                small = not part.startswith("</")
+            continue
+        for i, text in enumerate(part.split("\n")):
+            if i:
+                lines.append(runs)
+                runs = []
+            text = html.unescape(text)
+            if text:
+                runs.append((text, small))
+    lines.append(runs)
+    return [line for line in lines if line]
+
+
+def _paint(style, fill=None):
+    fill = fill or style.get("fillColor") or "#FFFFFF"
+    stroke = style.get("strokeColor") or "#000000"
+    opacity = _number(style.get("opacity"), 100) / 100
+    attrs = f'fill="{_attr(fill)}" stroke="{_attr(stroke)}"'
+    if opacity < 1:
+        attrs += f' fill-opacity="{_fmt(opacity)}" stroke-opacity="{_fmt(opacity)}"'
+    if style.get("dashed") == "1":
+        attrs += ' stroke-dasharray="3 3"'
+    return attrs
+
+
+def _polygon(points, paint):
+    return f'<polygon points="{" ".join(f"{_fmt(px)},{_fmt(py)}" for px, py in points)}" {paint}/>'
+
+
+def _shape(style, x, y, w, h):
+    paint = _paint(style)
+    shape = style_shape(style)
+    if shape == "ellipse":
+        return f'<ellipse cx="{_fmt(x + w / 2)}" cy="{_fmt(y + h / 2)}" rx="{_fmt(w / 2)}" ry="{_fmt(h / 2)}" {paint}/>'
+    if shape == "rhombus":
+        return _polygon([(x + w / 2, y), (x + w, y + h / 2), (x + w / 2, y + h), (x, y + h / 2)], paint)
+    if shape == "hexagon":
+        return _polygon([(x + w / 4, y), (x + 3 * w / 4, y), (x + w, y + h / 2),
+                         (x + 3 * w / 4, y + h), (x + w / 4, y + h), (x, y + h / 2)], paint)
+    if shape == "cylinder3":
+        ry = min(_number(style.get("size"), 15), h / 3)
+        rx = w / 2
+        top, bottom = y + ry, y + h - ry
+        body = (f"M{_fmt(x)} {_fmt(top)}A{_fmt(rx)} {_fmt(ry)} 0 0 1 {_fmt(x + w)} {_fmt(top)}"
+                f"V{_fmt(bottom)}A{_fmt(rx)} {_fmt(ry)} 0 0 1 {_fmt(x)} {_fmt(bottom)}Z")
+        lip = f"M{_fmt(x)} {_fmt(top)}A{_fmt(rx)} {_fmt(ry)} 0 0 0 {_fmt(x + w)} {_fmt(top)}"
+        return f'<path d="{body}" {paint}/><path d="{lip}" {_paint(style, fill="none")}/>'
+    if shape == "cloud":
+        # mxCloud's outline, scaled to the box.
+        def p(fx, fy):
+            return f"{_fmt(x + fx * w)} {_fmt(y + fy * h)}"
+        d = (f"M{p(0.25, 0.25)}C{p(0.05, 0.25)} {p(0, 0.5)} {p(0.16, 0.55)}"
+             f"C{p(0, 0.66)} {p(0.18, 0.9)} {p(0.31, 0.8)}C{p(0.4, 1)} {p(0.7, 1)} {p(0.8, 0.8)}"
+             f"C{p(1, 0.8)} {p(1, 0.6)} {p(0.875, 0.5)}C{p(1, 0.3)} {p(0.8, 0.1)} {p(0.625, 0.2)}"
+             f"C{p(0.5, 0.05)} {p(0.3, 0.05)} {p(0.25, 0.25)}Z")
+        return f'<path d="{d}" {paint}/>'
+    radius = min(w, h) * 0.15 if style.get("rounded") == "1" else 0
+    return f'<rect x="{_fmt(x)}" y="{_fmt(y)}" width="{_fmt(w)}" height="{_fmt(h)}" rx="{_fmt(radius)}" {paint}/>'
+
+
+def _label(style, value, x, y, w, h, top):
+    lines = _label_lines(value)
+    if not lines or style.get("noLabel") == "1":
+        return ""
+    heights = [LINE_HEIGHT * max(SMALL_FONT_SIZE if small else FONT_SIZE for _, small in line) for line in lines]
+    valign = style.get("verticalAlign") or ("top" if top else "middle")
+    if valign == "top":
+        cursor = y + LABEL_INSET
+    elif valign == "bottom":
+        cursor = y + h - LABEL_INSET - sum(heights)
+    else:
+        cursor = y + (h - sum(heights)) / 2
+    color = _attr(style.get("fontColor") or "#000000")
+    out = [f'<text text-anchor="middle" font-family="{FONT_FAMILY}" fill="{color}">']
+    for line, height in zip(lines, heights):
+        cursor += height
+        out.append(f'<tspan x="{_fmt(x + w / 2)}" y="{_fmt(cursor - height * 0.3)}">')
+        out.extend(f'<tspan font-size="{SMALL_FONT_SIZE if small else FONT_SIZE}">{escape(text)}</tspan>' for text, small in line)
+        out.append("</tspan>")
+    out.append("</text>")
+    return "".join(out)
+
+
+def _route(source, target):
+    # Orthogonal route leaving the side of `source` that faces `target`, like orthogonalEdgeStyle.
+    sx, sy, sw, sh = source
+    tx, ty, tw, th = target
+    dx = (tx + tw / 2) - (sx + sw / 2)
+    dy = (ty + th / 2) - (sy + sh / 2)
+    if abs(dx) >= abs(dy):
+        start = (sx + sw if dx > 0 else sx, sy + sh / 2)
+        end = (tx if dx > 0 else tx + tw, ty + th / 2)
+        mid = (start[0] + end[0]) / 2
+        return [start, (mid, start[1]), (mid, end[1]), end]
+    start = (sx + sw / 2, sy + sh if dy > 0 else sy)
+    end = (tx + tw / 2, ty if dy > 0 else ty + th)
+    mid = (start[1] + end[1]) / 2
+    return [start, (start[0], mid), (end[0], mid), end]
+
+
+def to_svg(xml):
+    """Render a draw.io document (e.g. validate_and_repair output) as an SVG string."""
+    model_attrs, cells = parse(xml)
+    by_id = {c.id: c for c in cells}
+    styles = {c.id: parse_style(c.style) for c in cells}
+    hidden_layers = {c.id for c in cells if c.is_layer and styles[c.id].get("visible") == "0"}
+    has_children = {c.parent for c in cells if c.vertex}
+
+    boxes = {}
+
+    def box(cell_id):
+        # Absolute box, walking up the parent chain; None for hidden or cyclic cells.
+        chain, seen, node = [], set(), by_id.get(cell_id)
+        while node is not None and node.vertex and node.id not in boxes:
+            if node.id in seen:
+                return None
+            seen.add(node.id)
+            chain.append(node)
+            node = by_id.get(node.parent)
+        if node is not None and node.id in hidden_layers:
+            return None
+        for cell in reversed(chain):
+            parent = boxes.get(cell.parent)
+            px, py = (parent[0], parent[1]) if parent else (0, 0)
+            g = cell.geometry
+            boxes[cell.id] = (px + _number(g.get("x")), py + _number(g.get("y")),
+                              _number(g.get("width"), 120), _number(g.get("height"), 60))
+        return boxes.get(cell_id)
+
+    vertices = [(c, box(c.id)) for c in cells if c.vertex]
+    vertices = [(c, b) for c, b in vertices if b is not None]
+    if not vertices:
+        raise ValueError("nothing to render: the diagram has no visible vertices")
+    left = min(b[0] for _, b in vertices) - MARGIN
+    top = min(b[1] for _, b in vertices) - MARGIN
+    width = max(b[0] + b[2] for _, b in vertices) + MARGIN - left
+    height = max(b[1] + b[3] for _, b in vertices) + MARGIN - top
+
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{_fmt(width)}" height="{_fmt(height)}" '
+           f'viewBox="{_fmt(left)} {_fmt(top)} {_fmt(width)} {_fmt(height)}">']
+    background = model_attrs.get("background")
+    if background and background != "none":
+        out.append(f'<rect x="{_fmt(left)}" y="{_fmt(top)}" width="{_fmt(width)}" height="{_fmt(height)}" fill="{_attr(background)}"/>')
+
+    markers, edges = {}, []
+    for cell in cells:
+        if not cell.edge:
+            continue
+        source, target = boxes.get(cell.source), boxes.get(cell.target)
+        if source is None or target is None:
+            continue
+        style = styles[cell.id]
+        stroke = style.get("strokeColor") or "#000000"
+        points = " ".join(f"{_fmt(px)},{_fmt(py)}" for px, py in _route(source, target))
+        arrow = ""
+        if style.get("endArrow", "classic") != "none":
+            marker = markers.setdefault(stroke, f"arrow{len(markers)}")
+            arrow = f' marker-end="url(#{marker})"'
+        edges.append(f'<polyline points="{points}" fill="none" stroke="{_attr(stroke)}"{arrow}/>')
+    if markers:
+        out.append("<defs>")
+        out.extend(f'<marker id="{marker}" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" markerHeight="8" '
+                   f'orient="auto-start-reverse"><path d="M0 0L10 5L0 10Z" fill="{_attr(stroke)}"/></marker>'
+                   for stroke, marker in markers.items())
+        out.append("</defs>")
+
+    # Containers first so their children paint over them, then edges, then the nodes' labels on top.
+    for cell, (x, y, w, h) in vertices:
+        out.append(_shape(styles[cell.id], x, y, w, h))
+        if cell.id in has_children:
+            out.append(_label(styles[cell.id], cell.value, x, y, w, h, top=True))
+    out.extend(edges)
+    for cell, (x, y, w, h) in vertices:
+        if cell.id not in has_children:
+            out.append(_label(styles[cell.id], cell.value, x, y, w, h, top=False))
+    out.append("</svg>")
+    return "".join(out)
+
+
+def to_png(svg, scale=2.0):
+    try:
+        import cairosvg
+    except (ImportError, OSError) as e:
+        # OSError: cairosvg is installed but the cairo library it loads is not.
+        raise RuntimeError("PNG export requires the cairosvg package and the cairo library") from e
+    return cairosvg.svg2png(bytestring=svg.encode("utf-8"), scale=scale)
+
+
+def render(xml, fmt="svg"):
+    """Rendered `xml` as bytes in `fmt` ("svg" or "png"); a top-level function so process pools can run it."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    svg = to_svg(xml)
+    return svg.encode("utf-8") if fmt == "svg" else to_png(svg)
@@ -0,0 +1,146 @@
+import re
+import time
+import xml.etree.ElementTree as ET
+
+from diagram.styles import GROUP_STYLE, EDGE_STYLE, parse_style, style_name, closest_node_style
+from pipeline.tokens import approx_tokens
+
+# Incremental checks on the code stage's token stream. Cells are validated as soon as
+# their closing tag arrives, so output the local validator could never repair (empty
+# labels, shapes outside the style list) is caught mid-stream and the call aborted.
+# Problems validate_and_repair fixes anyway (fences, prose, dangling edges) are only
+# reported as warnings.
+
+_FENCE = re.compile(r"^\s*```[\w-]*\s*$")
+
+
+class StreamCheck:
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("end",))
+        self._head = ""
+        self._started = False
+        self._done = False
+        self._ids = set()
+        self._pending = {}  # missing id -> edge ids waiting on it
+        self.started_at = time.perf_counter()
+        self.first_feedback_at = None
+        self.cells = 0
+        self.warnings = []
+        self.fatal = None
+        self.degraded = False
+
+    def _feedback(self):
+        if self.first_feedback_at is None:
+            self.first_feedback_at = time.perf_counter()
+
+    @property
+    def time_to_first_feedback(self):
+        if self.first_feedback_at is None:
+            return None
+        return self.first_feedback_at - self.started_at
+
+    def feed(self, chunk):
+        """Feed the next piece of model output; returns the mxCell elements it completed."""
+        if self._done or self.degraded or self.fatal:
+            return []
+        if not self._started:
+            self._head += chunk
+            start = self._head.find("<")
+            if start == -1:
+                return []
+            preamble = self._head[:start]
+            if preamble.strip():
+                self._feedback()
+                kind = "markdown fence" if _FENCE.match(preamble) else "text"
+                self.warnings.append(f"{kind} before the XML")
+            chunk, self._started = self._head[start:], True
+        try:
+            self._parser.feed(chunk)
+            return self._check(self._parser.read_events())
+        except ET.ParseError as e:
+            # Leave it to the final validate_and_repair pass (it can re-escape attributes).
+            self._feedback()
+            self.degraded = True
+            self.warnings.append(f"stopped incremental parsing: {e}")
+            return []
+
+    def _check(self, events):
+        completed = []
+        for _, elem in events:
+            if elem.tag == "mxGraphModel":
+                self._done = True
+                break
+            if elem.tag != "mxCell":
+                continue
+            self.cells += 1
+            self._feedback()
+            completed.append(elem)
+            self._check_cell(elem.attrib)
+            if self.fatal:
+                break
+        return completed
+
+    def _check_cell(self, a):
+        cell_id = a.get("id")
+        self._ids.add(cell_id)
+        self._pending.pop(cell_id, None)
+        style = a.get("style") or ""
+        if a.get("edge") == "1":
+            if a.get("value"):
+                self.warnings.append(f"edge {cell_id}: has a label")
+            if style_name(style) != EDGE_STYLE:
+                self.warnings.append(f"edge {cell_id}: style is not the Edges style")
+            for end in (a.get("source"), a.get("target")):
+                if end not in self._ids:
+                    self._pending.setdefault(end, []).append(cell_id)
+            return
+        if a.get("vertex") != "1" or style.startswith("layer"):
+            return
+        value = (a.get("value") or "").strip()
+        if not value or value == "None":
+            self.fatal = f"cell {cell_id} has an empty label"
+            return
+        name = style_name(style)
+        if name == GROUP_STYLE or "group" in parse_style(style):
+            return
+        if name is None and closest_node_style(style) is None:
+            self.fatal = f"cell {cell_id} uses style {style!r}, which is not in the VALID STYLE LIST"
+        elif name is None:
+            self.warnings.append(f"cell {cell_id}: style not in the VALID STYLE LIST")
+
+    def close(self):
+        for missing, edges in self._pending.items():
+            self.warnings.append(f"edges {', '.join(map(str, edges))}: dangling reference to {missing}")
+        self._pending.clear()
+
+
+class StreamStats:
+    def __init__(self):
+        self.attempts = 0
+        self.aborts = 0
+        self.wasted_tokens = 0
+        self.feedback_count = 0
+        self.feedback_seconds = 0.0
+        self.last_feedback_seconds = None
+
+    def record(self, check, text, aborted):
+        self.attempts += 1
+        if aborted:
+            self.aborts += 1
+            self.wasted_tokens += approx_tokens(text)
+        if check.time_to_first_feedback is not None:
+            self.feedback_count += 1
+            self.feedback_seconds += check.time_to_first_feedback
+            self.last_feedback_seconds = check.time_to_first_feedback
+
+    def stats(self):
+        return {
+            "attempts": self.attempts,
+            "aborts": self.aborts,
+            "wasted_tokens": self.wasted_tokens,
+            "first_feedback_avg_ms": 1000 * self.feedback_seconds / self.feedback_count if self.feedback_count else None,
+            "first_feedback_last_ms": 1000 * self.last_feedback_seconds if self.last_feedback_seconds is not None else None,
+        }
+
+
+stream_stats = StreamStats()
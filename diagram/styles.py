@@ -0,0 +1,117 @@
+import re
+
+# The VALID STYLE LIST named in prompts/shared_prompt.py. Prompts only carry the names;
+# the validator expands them to these strings.
+
+STYLES = {
+    "User/UI": "shape=rectangle;whiteSpace=wrap;html=1;rounded=1;perimeter=rectanglePerimeter;fillColor=#00FFFF;opacity=50;strokeColor=#00BFFF;fontColor=#000000;",
+    "Logic/Modules": "shape=rectangle;whiteSpace=wrap;html=1;rounded=1;perimeter=rectanglePerimeter;fillColor=#39FF14;opacity=50;strokeColor=#00CD00;fontColor=#000000;",
+    "Databases (Outline)": "shape=cylinder3;whiteSpace=wrap;html=1;rounded=1;boundedLbl=1;backgroundOutline=1;size=15;perimeter=ellipsePerimeter;fillColor=none;strokeColor=#FF6600;opacity=50;fontColor=#FFFFFF;",
+    "Databases (Filled Blue)": "shape=cylinder3;whiteSpace=wrap;html=1;rounded=1;boundedLbl=1;backgroundOutline=1;size=15;perimeter=ellipsePerimeter;fillColor=#0000FF;opacity=50;strokeColor=#0000AA;fontColor=#FFFFFF;",
+    "Databases (Filled Green)": "shape=cylinder3;whiteSpace=wrap;html=1;rounded=1;boundedLbl=1;backgroundOutline=1;size=15;perimeter=ellipsePerimeter;fillColor=#00FF00;opacity=50;strokeColor=#00AA00;fontColor=#000000;",
+    "Databases (Filled Red)": "shape=cylinder3;whiteSpace=wrap;html=1;rounded=1;boundedLbl=1;backgroundOutline=1;size=15;perimeter=ellipsePerimeter;fillColor=#FF0000;opacity=50;strokeColor=#AA0000;fontColor=#FFFFFF;",
+    "External APIs": "shape=cloud;whiteSpace=wrap;html=1;perimeter=cloudPerimeter;fillColor=#BF00FF;opacity=50;strokeColor=#800080;fontColor=#FFFFFF;",
+    "Queues": "shape=rhombus;whiteSpace=wrap;html=1;perimeter=rhombusPerimeter;fillColor=#FF00FF;opacity=50;strokeColor=#CC00CC;fontColor=#FFFFFF;",
+    "Monitoring/Logging": "shape=hexagon;perimeter=hexagonPerimeter2;whiteSpace=wrap;html=1;rounded=1;fillColor=#FF4500;opacity=50;strokeColor=#CC3300;fontColor=#FFFFFF;",
+    "LLMs": "shape=rectangle;whiteSpace=wrap;html=1;dashed=1;rounded=1;perimeter=rectanglePerimeter;fillColor=#BF00FF;opacity=50;strokeColor=#8A2BE2;fontColor=#FFFFFF;",
+    "Groups/Containers": "shape=rectangle;whiteSpace=wrap;html=1;dashed=1;rounded=1;fillColor=none;strokeColor=#00FFFF;fontColor=#00FFFF;noLabel=0;opacity=100;",
+    "Edges": "edgeStyle=orthogonalEdgeStyle;rounded=0;orthogonalLoop=1;jettySize=auto;html=1;endArrow=block;strokeColor=#00FFFF;endFill=1;",
+}
+
+GROUP_STYLE = "Groups/Containers"
+EDGE_STYLE = "Edges"
+NODE_STYLES = [name for name in STYLES if name not in (GROUP_STYLE, EDGE_STYLE)]
+
+# Earlier prompts listed the same styles without opacity (and a darker External APIs
+# palette); outputs using those variants are still accepted.
+_VARIANTS = {
+    "External APIs": "shape=cloud;whiteSpace=wrap;html=1;perimeter=cloudPerimeter;fillColor=#800080;strokeColor=#4B0082;fontColor=#FFFFFF;",
+}
+
+_SHAPE_TOKENS = {"ellipse", "rhombus", "cloud", "hexagon", "cylinder3", "rectangle"}
+
+
+def parse_style(style):
+    result = {}
+    for part in (style or "").split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        key, sep, value = part.partition("=")
+        result[key.strip()] = value.strip() if sep else None
+    return result
+
+
+def style_shape(parsed):
+    shape = parsed.get("shape")
+    if shape:
+        return shape
+    for token in _SHAPE_TOKENS:
+        if token in parsed and parsed[token] is None:
+            return token
+    return "rectangle"
+
+
+def _variant(style):
+    parsed = parse_style(style)
+    parsed.pop("opacity", None)
+    return parsed
+
+
+STYLE_LOOKUP = {}
+for _name, _style in STYLES.items():
+    STYLE_LOOKUP[frozenset(parse_style(_style).items())] = _name
+    STYLE_LOOKUP.setdefault(frozenset(_variant(_style).items()), _name)
+for _name, _style in _VARIANTS.items():
+    STYLE_LOOKUP[frozenset(parse_style(_style).items())] = _name
+
+
+_NAMES = {name.casefold(): name for name in STYLES}
+
+
+def style_name(style):
+    # Name of the valid style this string matches (ignoring key order), or None.
+    # Generation prompts ask for the bare name (style="Logic/Modules"), which matches too.
+    named = _NAMES.get((style or "").strip().rstrip(";").casefold())
+    if named is not None:
+        return named
+    return STYLE_LOOKUP.get(frozenset(parse_style(style).items()))
+
+
+def expand_style(style):
+    # Full style string for a bare style name; anything else is returned unchanged.
+    named = _NAMES.get((style or "").strip().rstrip(";").casefold())
+    return STYLES[named] if named is not None else style
+
+
+_STYLE_ATTR = re.compile(r'style="([^"]*)"')
+
+
+def compact_styles(xml):
+    # The inverse of expand_style over a whole document: valid style strings become their
+    # names, which cuts roughly a third of the tokens from XML sent back to an LLM.
+    def shorten(match):
+        named = style_name(match.group(1))
+        return f'style="{named}"' if named is not None else match.group(0)
+    return _STYLE_ATTR.sub(shorten, xml)
+
+
+_WEIGHTS = {"fillColor": 4, "strokeColor": 2, "dashed": 2, "fontColor": 1}
+
+
+def closest_node_style(style):
+    # Best valid node style with the same shape, or None if no style shares it.
+    parsed = parse_style(style)
+    shape = style_shape(parsed)
+    best, best_score = None, -1
+    for name in NODE_STYLES:
+        candidate = parse_style(STYLES[name])
+        if candidate["shape"] != shape:
+            continue
+        score = sum(_WEIGHTS.get(key, 0) for key, value in candidate.items() if parsed.get(key) == value)
+        if score > best_score:
+            best, best_score = name, score
+    if shape == "cylinder3" and best_score <= 0:
+        # Databases default to the filled blue style unless outline was intended.
+        return "Databases (Filled Blue)"
+    return best
@@ -0,0 +1,452 @@
+import io
+import math
+import re
+import zlib
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import List, Optional
+from xml.sax.saxutils import escape
+
+from diagram.model import decompress_diagram
+from diagram.styles import STYLES, GROUP_STYLE, EDGE_STYLE, parse_style, style_name, closest_node_style
+
+# Deterministic checker/repairer for the rules in prompts/shared_prompt.py.
+# Anything it can fix mechanically is fixed; whatever is left in `errors` needs the LLM fixer.
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>'
+MODEL_ATTRS = {
+    "dx": "1434", "dy": "784", "grid": "1", "gridSize": "10", "guides": "1", "tooltips": "1",
+    "connect": "1", "arrows": "1", "fold": "1", "page": "1", "pageScale": "1",
+    "pageWidth": "850", "pageHeight": "1100", "background": "#000000",
+}
+GROUP_PADDING = 20
+DEFAULT_SIZE = (120, 60)
+
+_FENCE = re.compile(r"^\s*```[\w-]*\s*|\s*```\s*$")
+_BARE_AMP = re.compile(r"&(?!(?:amp|lt|gt|quot|apos|#\d+|#x[0-9a-fA-F]+);)")
+_ATTR = re.compile(r'(\s[\w:.-]+=")([^"]*)(")')
+_XMLNS = re.compile(r'\sxmlns(?::[\w.-]+)?="[^"]*"')
+_COMPRESSED = re.compile(r"<diagram\b[^>]*>\s*([A-Za-z0-9+/=\s]+?)\s*</diagram>")
+_ROUTING_KEYS = ("entryX", "entryY", "exitX", "exitY", "entryDx", "entryDy", "exitDx", "exitDy")
+
+
+@dataclass(slots=True, eq=False)
+class Cell:
+    id: str
+    value: Optional[str]
+    style: Optional[str]
+    parent: Optional[str]
+    source: Optional[str]
+    target: Optional[str]
+    vertex: bool
+    edge: bool
+    geometry: dict
+    has_geometry: bool
+
+    @property
+    def is_layer(self):
+        return (self.style or "").startswith("layer")
+
+
+@dataclass
+class ValidationReport:
+    xml: Optional[str] = None
+    fixes: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return self.xml is not None and not self.errors
+
+
+def _strip_wrapping(text):
+    text = _FENCE.sub("", text.strip())
+    start = text.find("<mxGraphModel")
+    end = text.rfind("</mxGraphModel>")
+    if start == -1 or end == -1:
+        # A compressed .drawio file keeps the model deflated inside <diagram>.
+        match = _COMPRESSED.search(text)
+        if match is None:
+            return None
+        try:
+            return _strip_wrapping(decompress_diagram(match.group(1)))
+        except (ValueError, zlib.error):
+            return None
+    return text[start:end + len("</mxGraphModel>")]
+
+
+def _escape_attributes(text):
+    def fix(match):
+        value = _BARE_AMP.sub("&amp;", match.group(2)).replace("<", "&lt;").replace(">", "&gt;")
+        return match.group(1) + value + match.group(3)
+    return _ATTR.sub(fix, text)
+
+
+def _iter_cells(text):
+    # Streams the document, keeping only flat Cell records for mxCell elements.
+    model_attrs = None
+    for event, elem in ET.iterparse(io.StringIO(text), events=("start", "end")):
+        if event == "start":
+            if elem.tag == "mxGraphModel" and model_attrs is None:
+                model_attrs = dict(elem.attrib)
+            continue
+        if elem.tag in ("UserObject", "object"):
+            raise ValueError(f"unsupported <{elem.tag}> wrapper cell")
+        if elem.tag != "mxCell":
+            continue
+        a = elem.attrib
+        geo = elem.find("mxGeometry")
+        yield model_attrs, Cell(
+            id=a.get("id"),
+            value=a.get("value"),
+            style=a.get("style"),
+            parent=a.get("parent"),
+            source=a.get("source"),
+            target=a.get("target"),
+            vertex=a.get("vertex") == "1",
+            edge=a.get("edge") == "1",
+            geometry=dict(geo.attrib) if geo is not None else {},
+            has_geometry=geo is not None,
+        )
+        elem.clear()
+
+
+def _parse(text):
+    cells = []
+    model_attrs = None
+    for model_attrs, cell in _iter_cells(text):
+        cells.append(cell)
+    if model_attrs is None:
+        raise ValueError("missing <mxGraphModel> root")
+    return model_attrs, cells
+
+
+def parse(xml):
+    """(model attributes, cells) of an already-valid document, e.g. validate_and_repair output."""
+    return _parse(_strip_wrapping(xml) or "")
+
+
+def _number(value, default=0):
+    # NaN and infinities parse as floats but have no integer value; treat them as missing.
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return int(round(number)) if math.isfinite(number) else default
+
+
+def _attr(name, value):
+    return f' {name}="{escape(value, {chr(34): "&quot;"})}"'
+
+
+def serialize(model_attrs, cells):
+    out = [XML_HEADER, "\n<mxGraphModel"]
+    out.extend(_attr(k, v) for k, v in model_attrs.items())
+    out.append(">\n<root>\n<mxCell id=\"0\"/>\n<mxCell id=\"1\" parent=\"0\"/>\n")
+    for cell in cells:
+        out.append("<mxCell")
+        out.append(_attr("id", cell.id))
+        out.append(_attr("value", cell.value or ""))
+        out.append(_attr("style", cell.style))
+        if cell.vertex:
+            out.append(' vertex="1"')
+        if cell.edge:
+            out.append(' edge="1"')
+        out.append(_attr("parent", cell.parent))
+        if cell.edge:
+            out.append(_attr("source", cell.source))
+            out.append(_attr("target", cell.target))
+            out.append('>\n  <mxGeometry relative="1" as="geometry"/>\n</mxCell>\n')
+        else:
+            g = cell.geometry
+            out.append(f'>\n  <mxGeometry x="{g["x"]}" y="{g["y"]}" width="{g["width"]}" height="{g["height"]}" as="geometry"/>\n</mxCell>\n')
+    out.append("</root>\n</mxGraphModel>")
+    return "".join(out)
+
+
+def validate_and_repair(xml, renumber=True):
+    """Check `xml` against the verify prompt rules and repair what can be fixed locally.
+
+    Returns a ValidationReport; `report.ok` means the repaired `report.xml` needs no LLM pass.
+    With `renumber=False` existing ids are kept (for patching a saved diagram); only cells
+    without a usable id get a new one.
+    """
+    report = ValidationReport()
+    fixes, errors = report.fixes, report.errors
+
+    text = _strip_wrapping(xml or "")
+    if text is None:
+        errors.append("no <mxGraphModel> element found")
+        return report
+    body = (xml or "").strip()
+    if body.startswith("<?xml"):
+        body = body[body.find("?>") + 2:].strip()
+    if text != body:
+        fixes.append("removed text outside <mxGraphModel>")
+
+    head_end = text.find(">") + 1
+    head = _XMLNS.sub("", text[:head_end])
+    if len(head) != head_end:
+        fixes.append("removed xmlns from <mxGraphModel>")
+        text = head + text[head_end:]
+
+    try:
+        model_attrs, cells = _parse(text)
+    except ET.ParseError:
+        try:
+            model_attrs, cells = _parse(_escape_attributes(text))
+            fixes.append("escaped special characters in attributes")
+        except (ET.ParseError, ValueError) as e:
+            errors.append(f"XML is not well-formed: {e}")
+            return report
+    except ValueError as e:
+        errors.append(str(e))
+        return report
+
+    for key, value in MODEL_ATTRS.items():
+        model_attrs.setdefault(key, value)
+
+    ids = [c.id for c in cells]
+    if "0" not in ids or "1" not in ids:
+        fixes.append("added base cells 0/1")
+
+    # Resolve references against the first cell carrying each id.
+    by_id = {}
+    for cell in cells:
+        if cell.id is None:
+            continue
+        if cell.id in by_id:
+            fixes.append(f"duplicate id {cell.id} renumbered")
+        else:
+            by_id[cell.id] = cell
+
+    layers, vertices, edges, nodes = [], [], [], []
+    for cell in cells:
+        if cell.id in ("0", "1") and by_id.get(cell.id) is cell:
+            continue
+        if cell.is_layer:
+            layers.append(cell)
+            nodes.append(cell)
+        elif cell.edge or (not cell.vertex and (cell.source or cell.target)):
+            if not cell.edge:
+                fixes.append(f"cell {cell.id}: added edge=\"1\"")
+                cell.edge = True
+            cell.vertex = False
+            edges.append(cell)
+        elif cell.vertex or cell.has_geometry:
+            if not cell.vertex:
+                fixes.append(f"cell {cell.id}: added vertex=\"1\"")
+                cell.vertex = True
+            vertices.append(cell)
+            nodes.append(cell)
+        else:
+            fixes.append(f"cell {cell.id}: removed cell with no vertex/edge role")
+
+    # Layers: parent 1, zero geometry, name mirrors value.
+    for layer in layers:
+        name = layer.value or parse_style(layer.style).get("name") or f"Layer {layer.id}"
+        style = f"layer;name={name};visible={parse_style(layer.style).get('visible') or '1'};"
+        if layer.parent != "1" or layer.style != style or layer.value != name:
+            fixes.append(f"layer {layer.id}: normalised parent/style/name")
+        layer.parent, layer.style, layer.value = "1", style, name
+        layer.vertex = layer.edge = False
+        if any(_number(layer.geometry.get(k)) != 0 for k in ("x", "y", "width", "height")):
+            fixes.append(f"layer {layer.id}: geometry reset to 0,0,0,0")
+        layer.geometry = {"x": 0, "y": 0, "width": 0, "height": 0}
+
+    # Vertices must hang off a layer or group, never off the root.
+    containers = ({c.id for c in layers} | {c.id for c in vertices}) - {None}
+    orphaned = [v for v in vertices if v.parent not in containers or v.parent == v.id]
+    if orphaned:
+        if not layers:
+            layer = Cell(None, "Default", "layer;name=Default;visible=1;", "1", None, None, False, False,
+                         {"x": 0, "y": 0, "width": 0, "height": 0}, True)
+            layers.append(layer)
+            nodes.insert(0, layer)
+            fixes.append("added a default layer for cells parented to the root")
+        for v in orphaned:
+            fixes.append(f"cell {v.id}: reparented from {v.parent!r} to layer")
+            v.parent = layers[0]
+
+    parents = {v.parent for v in vertices}
+    for v in vertices:
+        if v.value is None or not v.value.strip() or v.value.strip() == "None":
+            errors.append(f"cell {v.id}: vertex has an empty label")
+        if not v.has_geometry:
+            errors.append(f"cell {v.id}: vertex has no mxGeometry")
+        is_group = v.id in parents or "group" in parse_style(v.style) or style_name(v.style) == GROUP_STYLE
+        if is_group:
+            target = GROUP_STYLE
+        else:
+            target = style_name(v.style)
+            if target is None or target in (GROUP_STYLE, EDGE_STYLE):
+                target = closest_node_style(v.style)
+        if target is None:
+            errors.append(f"cell {v.id}: style {v.style!r} matches no valid style")
+            target_style = v.style
+        else:
+            target_style = STYLES[target]
+        if target_style != v.style:
+            fixes.append(f"cell {v.id}: style set to {target}")
+            v.style = target_style
+        g = v.geometry
+        if v.has_geometry and (g.get("width") is None or g.get("height") is None):
+            fixes.append(f"cell {v.id}: default size applied")
+        invalid = [k for k in ("x", "y", "width", "height") if g.get(k) is not None and _number(g[k], None) is None]
+        if invalid:
+            fixes.append(f"cell {v.id}: non-numeric {', '.join(invalid)} replaced")
+        v.geometry = {
+            "x": _number(g.get("x")),
+            "y": _number(g.get("y")),
+            "width": _number(g.get("width"), DEFAULT_SIZE[0]) or DEFAULT_SIZE[0],
+            "height": _number(g.get("height"), DEFAULT_SIZE[1]) or DEFAULT_SIZE[1],
+        }
+
+    vertex_ids = {id(v) for v in vertices}
+    # "0" and "1" always mean the base cells, even when a later cell reuses the id.
+    cell_of = {}
+    for c in layers + vertices:
+        if c.id is not None and c.id not in ("0", "1"):
+            cell_of.setdefault(c.id, c)
+
+    def parent_of(cell):
+        return cell.parent if isinstance(cell.parent, Cell) else cell_of.get(cell.parent)
+
+    def ancestors(cell):
+        chain = []
+        node = parent_of(cell)
+        while node is not None and node not in chain:
+            chain.append(node)
+            node = parent_of(node)
+        return chain
+
+    kept = []
+    for e in edges:
+        src, dst = cell_of.get(e.source), cell_of.get(e.target)
+        if src is None or dst is None or id(src) not in vertex_ids or id(dst) not in vertex_ids:
+            fixes.append(f"edge {e.id}: removed, source/target is not an existing vertex")
+            continue
+        if e.value:
+            fixes.append(f"edge {e.id}: label removed")
+            e.value = ""
+        if e.style != STYLES[EDGE_STYLE]:
+            routing = [k for k in _ROUTING_KEYS if k in parse_style(e.style)]
+            fixes.append(f"edge {e.id}: style set to Edges" + (f" (dropped {', '.join(routing)})" if routing else ""))
+            e.style = STYLES[EDGE_STYLE]
+        src_chain = ancestors(src)
+        common = next((c for c in ancestors(dst) if c in src_chain), None)
+        expected = common if common is not None else "1"
+        current = "1" if e.parent == "1" else parent_of(e)
+        if current is not expected and current != expected:
+            fixes.append(f"edge {e.id}: reparented to lowest common container")
+        e.parent = expected
+        e.source, e.target = src, dst
+        kept.append(e)
+    edges = kept
+
+    _fit_groups(vertices, layers, parent_of, fixes)
+
+    # Renumber: layers/vertices in document order with every parent before its
+    # children, edges last.
+    ordered = []
+    state = {}
+
+    def emit(cell):
+        if state.get(id(cell)) == "done":
+            return
+        if state.get(id(cell)) == "visiting":
+            errors.append(f"cell {cell.id}: parent chain is cyclic")
+            return
+        state[id(cell)] = "visiting"
+        parent = parent_of(cell)
+        if parent is not None:
+            emit(parent)
+        state[id(cell)] = "done"
+        ordered.append(cell)
+
+    for cell in nodes:
+        emit(cell)
+    ordered.extend(edges)
+
+    new_ids = {}
+    if renumber:
+        renumbered = False
+        for index, cell in enumerate(ordered, start=2):
+            if cell.id != str(index):
+                renumbered = True
+            new_ids[id(cell)] = str(index)
+        if renumbered:
+            fixes.append("ids renumbered sequentially from 2")
+    else:
+        taken = {"0", "1"}
+        for cell in ordered:
+            if cell.id is not None and cell.id not in taken and by_id.get(cell.id) is cell:
+                new_ids[id(cell)] = cell.id
+                taken.add(cell.id)
+        next_id = 2
+        for cell in ordered:
+            if id(cell) in new_ids:
+                continue
+            while str(next_id) in taken:
+                next_id += 1
+            new_ids[id(cell)] = str(next_id)
+            taken.add(str(next_id))
+            fixes.append(f"cell {cell.id}: given new id {next_id}")
+
+    def ref(target):
+        if isinstance(target, Cell):
+            return new_ids[id(target)]
+        if target in ("0", "1"):
+            return target
+        return new_ids[id(cell_of[target])]
+
+    resolved = []
+    for cell in ordered:
+        parent = ref(cell.parent)
+        source = ref(cell.source) if cell.edge else None
+        target = ref(cell.target) if cell.edge else None
+        resolved.append(Cell(new_ids[id(cell)], cell.value, cell.style, parent, source, target,
+                             cell.vertex, cell.edge, cell.geometry, True))
+
+    report.xml = serialize(model_attrs, resolved)
+    return report
+
+
+def _fit_groups(vertices, layers, parent_of, fixes):
+    # Grow groups (innermost first) so children sit at least GROUP_PADDING inside,
+    # and shift top-level cells so no coordinate is negative.
+    by_parent = {}
+    for v in vertices:
+        by_parent.setdefault(id(parent_of(v)), []).append(v)
+
+    def depth(cell):
+        d, node = 0, parent_of(cell)
+        while node is not None and d < len(vertices):
+            d, node = d + 1, parent_of(node)
+        return d
+
+    for group in sorted((v for v in vertices if id(v) in by_parent), key=depth, reverse=True):
+        kids = by_parent[id(group)]
+        min_x = min(k.geometry["x"] for k in kids)
+        min_y = min(k.geometry["y"] for k in kids)
+        dx, dy = max(0, GROUP_PADDING - min_x), max(0, GROUP_PADDING - min_y)
+        if dx or dy:
+            for k in kids:
+                k.geometry["x"] += dx
+                k.geometry["y"] += dy
+        g = group.geometry
+        width = max(k.geometry["x"] + k.geometry["width"] for k in kids) + GROUP_PADDING
+        height = max(k.geometry["y"] + k.geometry["height"] for k in kids) + GROUP_PADDING
+        if dx or dy or width > g["width"] or height > g["height"]:
+            fixes.append(f"group {group.id}: geometry adjusted to enclose children with {GROUP_PADDING}px padding")
+            g["width"], g["height"] = max(g["width"], width), max(g["height"], height)
+
+    top = [v for v in vertices if parent_of(v) is None or parent_of(v) in layers]
+    if top:
+        dx = max(0, -min(v.geometry["x"] for v in top))
+        dy = max(0, -min(v.geometry["y"] for v in top))
+        if dx or dy:
+            fixes.append("shifted top-level cells to positive coordinates")
+            for v in top:
+                v.geometry["x"] += dx
+                v.geometry["y"] += dy
@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional
+
+# Pluggable store for finished diagrams, picked with ARTIFACT_STORE:
+#   local   - one file per diagram under ARTIFACT_DIR, named by the caller (default)
+#   content - content-addressed files under ARTIFACT_DIR/<sha256[:2]>/<sha256>.drawio, so
+#             identical diagrams are written once whatever they are called
+#   memory  - in-process LRU of ARTIFACT_MEMORY_ENTRIES diagrams, for containers without
+#             a writable volume
+# Disk reads and writes run in a worker thread so a slow volume never blocks the event
+# loop. Every stored diagram can be read back as the MCP resource drawio://artifacts/<id>.
+
+STORE = os.getenv("ARTIFACT_STORE", "local")
+ARTIFACT_DIR = os.path.expanduser(os.getenv("ARTIFACT_DIR", "~/Downloads"))
+MEMORY_ENTRIES = int(os.getenv("ARTIFACT_MEMORY_ENTRIES", "256"))
+URI_PREFIX = "drawio://artifacts/"
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+@dataclass
+class Artifact:
+    id: str
+    sha256: str
+    bytes: int
+    path: Optional[str] = None
+
+    @property
+    def uri(self):
+        return URI_PREFIX + self.id
+
+    def describe(self):
+        result = {"id": self.id, "uri": self.uri, "sha256": self.sha256, "bytes": self.bytes}
+        if self.path:
+            result["drawio_path"] = self.path
+        return result
+
+
+def artifact_id(ref):
+    # Accepts a drawio://artifacts/ URI or a bare id.
+    return ref[len(URI_PREFIX):] if ref.startswith(URI_PREFIX) else ref
+
+
+def write_atomic(path, data):
+    # Write then rename, so readers never see half a diagram.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{id(data)}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+class ArtifactStore:
+    """Base class; subclasses implement `_put(name, data, digest) -> (Artifact, written)` and `get(id)`."""
+
+    backend = None
+
+    def __init__(self):
+        self.puts = 0
+        self.deduplicated = 0
+        self.bytes_written = 0
+        self.put_seconds = 0.0
+
+    async def put(self, name, content):
+        start = time.perf_counter()
+        data = content.encode("utf-8")
+        artifact, written = await self._put(name, data, hashlib.sha256(data).hexdigest())
+        self.puts += 1
+        if written:
+            self.bytes_written += len(data)
+        else:
+            self.deduplicated += 1
+        self.put_seconds += time.perf_counter() - start
+        return artifact
+
+    async def _put(self, name, data, digest):
+        raise NotImplementedError
+
+    async def get(self, artifact_id):
+        raise NotImplementedError
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "puts": self.puts,
+            "deduplicated": self.deduplicated,
+            "bytes_written": self.bytes_written,
+            "put_avg_ms": 1000 * self.put_seconds / self.puts if self.puts else 0.0,
+        }
+
+
+class LocalStore(ArtifactStore):
+    backend = "local"
+
+    def __init__(self, directory=ARTIFACT_DIR):
+        super().__init__()
+        self.directory = directory
+
+    def _path(self, name):
+        # Names never leave the store directory.
+        name = os.path.basename(name)
+        return os.path.join(self.directory, name if name.endswith(".drawio") else name + ".drawio")
+
+    async def _put(self, name, data, digest):
+        path = self._path(name)
+        await asyncio.to_thread(write_atomic, path, data)
+        return Artifact(os.path.basename(path), digest, len(data), path), True
+
+    async def get(self, artifact_id):
+        path = os.path.realpath(self._path(artifact_id))
+        root = os.path.realpath(self.directory)
+        if os.path.commonpath([root, path]) != root:
+            return None  # a symlink out of the store directory
+        return await asyncio.to_thread(_read, path)
+
+
+class ContentStore(ArtifactStore):
+    backend = "content"
+
+    def __init__(self, directory=ARTIFACT_DIR):
+        super().__init__()
+        self.directory = directory
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}.drawio")
+
+    async def _put(self, name, data, digest):
+        path = self._path(digest)
+        written = not await asyncio.to_thread(os.path.exists, path)
+        if written:
+            await asyncio.to_thread(write_atomic, path, data)
+        return Artifact(digest, digest, len(data), path), written
+
+    async def get(self, artifact_id):
+        if not _DIGEST.match(artifact_id):
+            return None
+        return await asyncio.to_thread(_read, self._path(artifact_id))
+
+
+class MemoryStore(ArtifactStore):
+    backend = "memory"
+
+    def __init__(self, max_entries=MEMORY_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    async def _put(self, name, data, digest):
+        with self._lock:
+            written = digest not in self._items
+            self._items[digest] = data
+            self._items.move_to_end(digest)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return Artifact(digest, digest, len(data)), written
+
+    async def get(self, artifact_id):
+        with self._lock:
+            data = self._items.get(artifact_id)
+            if data is not None:
+                self._items.move_to_end(artifact_id)
+        return data.decode("utf-8") if data is not None else None
+
+    def stats(self):
+        return {**super().stats(), "items": len(self._items)}
+
+
+_store = None
+
+
+def get_store(backend=STORE):
+    """Process-wide artifact store for `backend`, created on first use."""
+    global _store
+    if _store is None:
+        if backend == "local":
+            _store = LocalStore()
+        elif backend == "content":
+            _store = ContentStore()
+        elif backend == "memory":
+            _store = MemoryStore()
+        else:
+            raise ValueError(f"Unknown ARTIFACT_STORE {backend!r}")
+    return _store
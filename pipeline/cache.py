@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from threading import Lock
+
+from pipeline import registry, metrics
+
+# Content-addressed cache for pipeline results: an in-memory LRU tier in front of a
+# directory of JSON files, read and written off the event loop. Keys cover the normalized
+# prompt, every model tier of the stages that produce the result, the LLM provider, the
+# diagram output mode and the prompt template version. Editing a prompt, changing a tier or
+# the output mode, or running against the fake or replayed provider therefore never serves
+# output cached under other settings.
+
+CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(".cache", "results"))
+MEMORY_ENTRIES = int(os.getenv("RESULT_CACHE_ENTRIES", "512"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt):
+    # Case, unicode form, surrounding punctuation and whitespace runs don't change the diagram.
+    text = unicodedata.normalize("NFKC", prompt or "").casefold()
+    return _WHITESPACE.sub(" ", text).strip(" .!?")
+
+
+def prompt_version():
+    specs = json.dumps(registry.PROMPT_SPECS, sort_keys=True)
+    return hashlib.sha256(specs.encode("utf-8")).hexdigest()[:12]
+
+
+class ResultCache:
+    def __init__(self, directory=CACHE_DIR, max_entries=MEMORY_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self.bypassed = 0
+
+    def key(self, stage, prompt):
+        raw = json.dumps([stage, normalize_prompt(prompt), registry.stage_models(stage),
+                          registry.llm_backend(), registry.output_mode(), prompt_version()], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)["value"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write(self, key, stage, value):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{id(value)}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"stage": stage, "value": value}, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            metrics.log("result_cache_write_failed", logging.WARNING, stage=stage, error=str(e))
+
+    async def get(self, stage, prompt):
+        key = self.key(stage, prompt)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return self._memory[key]
+        if self.directory:
+            value = await asyncio.to_thread(self._read, key)
+            if value is not None:
+                self.hits["disk"] += 1
+                self._remember(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, stage, prompt, value):
+        key = self.key(stage, prompt)
+        self._remember(key, value)
+        if self.directory:
+            await asyncio.to_thread(self._write, key, stage, value)
+
+    def stats(self):
+        lookups = self.hits["memory"] + self.hits["disk"] + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_hits": self.hits["memory"],
+            "disk_hits": self.hits["disk"],
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+        }
+
+
+results = ResultCache()
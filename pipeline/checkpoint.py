@@ -0,0 +1,228 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from functools import cache
+from threading import RLock
+
+# Pluggable checkpoint store for the LangGraph pipeline, picked with CHECKPOINT_BACKEND:
+#   memory - in-process, LRU-evicted by thread count, total bytes and idle TTL (default)
+#   sqlite - on-disk via langgraph-checkpoint-sqlite, same thread-count/TTL eviction
+#   none   - no checkpointing, for stateless one-shot generations
+
+BACKEND = os.getenv("CHECKPOINT_BACKEND", "memory")
+MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "1000"))
+MAX_BYTES = int(os.getenv("CHECKPOINT_MAX_BYTES", str(64 * 1024 * 1024)))
+TTL_SECONDS = float(os.getenv("CHECKPOINT_TTL_SECONDS", "3600"))
+SQLITE_PATH = os.getenv("CHECKPOINT_SQLITE_PATH", "checkpoints.sqlite")
+
+
+class EvictionPolicy:
+    """LRU bookkeeping of checkpoint threads, shared by the bounded savers."""
+
+    def __init__(self, max_threads=MAX_THREADS, max_bytes=MAX_BYTES, ttl=TTL_SECONDS):
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._threads = OrderedDict()  # thread_id -> [last_access, bytes]
+        self._lock = RLock()
+        self.bytes = 0
+        self.evictions = 0
+        self.puts = 0
+        self.put_seconds = 0.0
+        self.put_max_seconds = 0.0
+        self.gets = 0
+        self.get_seconds = 0.0
+
+    def touch(self, thread_id, added_bytes=0):
+        # Record activity on `thread_id`; returns the threads that must now be evicted.
+        now = time.monotonic()
+        with self._lock:
+            entry = self._threads.pop(thread_id, None) or [now, 0]
+            entry[0] = now
+            entry[1] += added_bytes
+            self.bytes += added_bytes
+            self._threads[thread_id] = entry
+            evicted = []
+            for tid, (last, size) in list(self._threads.items()):
+                if tid == thread_id:
+                    break
+                if (len(self._threads) > self.max_threads or self.bytes > self.max_bytes
+                        or (self.ttl and now - last > self.ttl)):
+                    del self._threads[tid]
+                    self.bytes -= size
+                    evicted.append(tid)
+                else:
+                    break
+            self.evictions += len(evicted)
+            return evicted
+
+    def forget(self, thread_id):
+        with self._lock:
+            entry = self._threads.pop(thread_id, None)
+            if entry:
+                self.bytes -= entry[1]
+
+    def record_put(self, seconds):
+        self.puts += 1
+        self.put_seconds += seconds
+        self.put_max_seconds = max(self.put_max_seconds, seconds)
+
+    def record_get(self, seconds):
+        self.gets += 1
+        self.get_seconds += seconds
+
+    def stats(self):
+        return {
+            "threads": len(self._threads),
+            "bytes": self.bytes,
+            "evictions": self.evictions,
+            "puts": self.puts,
+            "put_avg_ms": 1000 * self.put_seconds / self.puts if self.puts else 0.0,
+            "put_max_ms": 1000 * self.put_max_seconds,
+            "gets": self.gets,
+            "get_avg_ms": 1000 * self.get_seconds / self.gets if self.gets else 0.0,
+        }
+
+
+@cache
+def _memory_saver_class():
+    # langgraph's savers are imported on first use, which keeps them off the server's startup path.
+    from langgraph.checkpoint.memory import MemorySaver
+
+    class BoundedMemorySaver(MemorySaver):
+        """MemorySaver that evicts least-recently-used threads past the policy limits."""
+
+        def __init__(self, policy=None, **kwargs):
+            super().__init__(**kwargs)
+            self.policy = policy or EvictionPolicy()
+
+        def get_tuple(self, config):
+            start = time.perf_counter()
+            result = super().get_tuple(config)
+            self.policy.record_get(time.perf_counter() - start)
+            return result
+
+        def put(self, config, checkpoint, metadata, new_versions):
+            start = time.perf_counter()
+            result = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = config["configurable"]["thread_id"]
+            ns = config["configurable"]["checkpoint_ns"]
+            saved = self.storage[thread_id][ns][checkpoint["id"]]
+            size = len(saved[0][1]) + len(saved[1][1])
+            size += sum(len(self.blobs[(thread_id, ns, k, v)][1]) for k, v in new_versions.items())
+            self._evict(self.policy.touch(thread_id, size))
+            self.policy.record_put(time.perf_counter() - start)
+            return result
+
+        def put_writes(self, config, writes, task_id, task_path=""):
+            key = (config["configurable"]["thread_id"], config["configurable"].get("checkpoint_ns", ""),
+                   config["configurable"]["checkpoint_id"])
+            before = sum(len(w[2][1]) for w in self.writes.get(key, {}).values())
+            super().put_writes(config, writes, task_id, task_path)
+            after = sum(len(w[2][1]) for w in self.writes.get(key, {}).values())
+            self._evict(self.policy.touch(key[0], after - before))
+
+        def delete_thread(self, thread_id):
+            super().delete_thread(thread_id)
+            self.policy.forget(thread_id)
+
+        def _evict(self, thread_ids):
+            for thread_id in thread_ids:
+                super().delete_thread(thread_id)
+
+    return BoundedMemorySaver
+
+
+@cache
+def _sqlite_saver_class():
+    try:
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    except ImportError as e:
+        raise RuntimeError(
+            "CHECKPOINT_BACKEND=sqlite requires the langgraph-checkpoint-sqlite package"
+        ) from e
+
+    class BoundedSqliteSaver(AsyncSqliteSaver):
+        """AsyncSqliteSaver that deletes least-recently-used threads past the policy limits."""
+
+        def __init__(self, conn, policy=None, **kwargs):
+            super().__init__(conn, **kwargs)
+            # Bytes live on disk, so only the thread count and TTL bound this store.
+            self.policy = policy or EvictionPolicy(max_bytes=float("inf"))
+
+        async def aget_tuple(self, config):
+            start = time.perf_counter()
+            result = await super().aget_tuple(config)
+            self.policy.record_get(time.perf_counter() - start)
+            return result
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            start = time.perf_counter()
+            result = await super().aput(config, checkpoint, metadata, new_versions)
+            for thread_id in self.policy.touch(config["configurable"]["thread_id"]):
+                await super().adelete_thread(thread_id)
+            self.policy.record_put(time.perf_counter() - start)
+            return result
+
+        async def adelete_thread(self, thread_id):
+            await super().adelete_thread(thread_id)
+            self.policy.forget(thread_id)
+
+    return BoundedSqliteSaver
+
+
+_checkpointer = None
+_opened = False
+_open_lock = asyncio.Lock()
+
+
+async def get_checkpointer(backend=BACKEND):
+    """Process-wide checkpointer for `backend`, created on first use (None for "none")."""
+    global _checkpointer, _opened
+    if _opened:
+        return _checkpointer
+    async with _open_lock:
+        if not _opened:
+            if backend == "memory":
+                _checkpointer = _memory_saver_class()()
+            elif backend == "sqlite":
+                saver_class = _sqlite_saver_class()
+                import aiosqlite
+                _checkpointer = saver_class(await aiosqlite.connect(SQLITE_PATH))
+            elif backend == "none":
+                _checkpointer = None
+            else:
+                raise ValueError(f"Unknown CHECKPOINT_BACKEND {backend!r}")
+            _opened = True
+    return _checkpointer
+
+
+async def close():
+    """Close the checkpointer's database connection, if any; the next get_checkpointer reopens it.
+
+    aiosqlite runs each connection on a non-daemon thread, so an open sqlite store keeps the
+    interpreter alive after the server stops. The server calls this when it shuts down.
+    """
+    global _checkpointer, _opened
+    async with _open_lock:
+        conn = getattr(_checkpointer, "conn", None)
+        _checkpointer, _opened = None, False
+        if conn is not None:
+            await conn.close()
+
+
+def preload(backend=BACKEND):
+    # Import the saver for `backend` without opening it; server.warm_up runs this off the event loop.
+    if backend == "memory":
+        _memory_saver_class()
+    elif backend == "sqlite":
+        _sqlite_saver_class()
+
+
+def stats():
+    policy = getattr(_checkpointer, "policy", None)
+    result = {"backend": BACKEND}
+    if policy is not None:
+        result.update(policy.stats())
+    return result
@@ -0,0 +1,50 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class RequestLimiter:
+    """At most `max_concurrency` requests run at once; up to `max_queue` more may wait.
+
+    Anything beyond that is rejected immediately with QueueFullError instead of piling up.
+    A batch reserves places for all of its workers up front; their slots then draw on that
+    reservation instead of being admitted one by one.
+    """
+
+    def __init__(self, max_concurrency, max_queue):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending = 0
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def _admit(self, n):
+        if self._pending + n > self.max_concurrency + self.max_queue:
+            raise QueueFullError(f"{self._pending} requests already running or queued")
+        self._pending += n
+
+    @contextmanager
+    def reserve(self, n):
+        self._admit(n)
+        try:
+            yield
+        finally:
+            self._pending -= n
+
+    @asynccontextmanager
+    async def slot(self, reserved=False):
+        # reserved: the caller holds a place from reserve(), so it is neither checked nor counted again.
+        if not reserved:
+            self._admit(1)
+        try:
+            async with self._semaphore:
+                yield
+        finally:
+            if not reserved:
+                self._pending -= 1
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional
+
+from diagram.render import FORMATS, render
+from pipeline.artifacts import write_atomic
+
+# Diagram export to SVG (and PNG when cairosvg is installed). Rendering is CPU-bound, so
+# it runs in a pool of EXPORT_WORKERS processes and never holds the event loop or the GIL
+# of the server process. Renders are cached by (diagram sha256, format): an in-memory LRU
+# in front of EXPORT_CACHE_DIR, and concurrent requests for one diagram share a single
+# render. Exports can be read back as the MCP resource drawio://exports/<sha256>.<format>.
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", str(min(4, os.cpu_count() or 1))))  # 0 renders in a thread
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join(".cache", "exports"))
+EXPORT_CACHE_ENTRIES = int(os.getenv("EXPORT_CACHE_ENTRIES", "128"))
+URI_PREFIX = "drawio://exports/"
+MEDIA_TYPES = {"svg": "image/svg+xml", "png": "image/png"}
+
+
+@dataclass
+class Export:
+    sha256: str
+    fmt: str
+    data: bytes
+    path: Optional[str] = None
+
+    @property
+    def name(self):
+        return f"{self.sha256}.{self.fmt}"
+
+    @property
+    def uri(self):
+        return URI_PREFIX + self.name
+
+    def describe(self):
+        result = {"uri": self.uri, "format": self.fmt, "media_type": MEDIA_TYPES[self.fmt], "bytes": len(self.data)}
+        if self.path:
+            result["path"] = os.path.abspath(self.path)
+        return result
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _context():
+    # Never "fork": the server process has uvicorn, to_thread, checkpointer and limiter threads,
+    # and a child forked while one of them holds a lock (logging, the result cache, the import
+    # lock) can deadlock. The forkserver is started clean, imports the server's __main__ module
+    # and the renderer once, and forks each worker from that single-threaded process; spawn is
+    # the fallback where forkserver is not available. The pool itself is only created on the
+    # first export.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["__main__", "diagram.render"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class Exporter:
+    def __init__(self, workers=EXPORT_WORKERS, directory=EXPORT_CACHE_DIR, max_entries=EXPORT_CACHE_ENTRIES):
+        self.workers = workers
+        self.directory = directory
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = Lock()
+        self._pool = None
+        self.hits = {"memory": 0, "disk": 0, "shared": 0}
+        self.renders = 0
+        self.render_seconds = 0.0
+        self.failures = 0
+
+    def _path(self, name):
+        return os.path.join(self.directory, name[:2], name) if self.directory else None
+
+    def _executor(self):
+        if self._pool is None and self.workers > 0:
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=_context())
+        return self._pool
+
+    def _remember(self, export):
+        with self._lock:
+            self._memory[export.name] = export
+            self._memory.move_to_end(export.name)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    async def get(self, name):
+        """A cached export by "<sha256>.<format>", or None."""
+        with self._lock:
+            export = self._memory.get(name)
+            if export is not None:
+                self._memory.move_to_end(name)
+                self.hits["memory"] += 1
+                return export
+        sha256, _, fmt = name.partition(".")
+        if not self.directory or fmt not in FORMATS or len(sha256) != 64:
+            return None
+        data = await asyncio.to_thread(_read, self._path(name))
+        if data is None:
+            return None
+        self.hits["disk"] += 1
+        export = Export(sha256, fmt, data, self._path(name))
+        self._remember(export)
+        return export
+
+    async def export(self, xml, fmt):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+        name = f"{hashlib.sha256(xml.encode('utf-8')).hexdigest()}.{fmt}"
+        export = await self.get(name)
+        if export is not None:
+            return export
+        task = self._inflight.get(name)
+        if task is not None:
+            self.hits["shared"] += 1
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(self._render(name, xml, fmt))
+        self._inflight[name] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._inflight.pop(name, None)
+            else:
+                task.add_done_callback(lambda _: self._inflight.pop(name, None))
+
+    async def _render(self, name, xml, fmt):
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            data = await loop.run_in_executor(self._executor(), render, xml, fmt)
+        except Exception:
+            self.failures += 1
+            raise
+        self.renders += 1
+        self.render_seconds += time.perf_counter() - start
+        path = self._path(name)
+        if path:
+            await asyncio.to_thread(write_atomic, path, data)
+        export = Export(name.partition(".")[0], fmt, data, path)
+        self._remember(export)
+        return export
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "renders": self.renders,
+            "render_avg_ms": 1000 * self.render_seconds / self.renders if self.renders else 0.0,
+            "failures": self.failures,
+            "hits": dict(self.hits),
+            "cached": len(self._memory),
+        }
+
+
+exporter = Exporter()
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+
+import anyio
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+
+# Long-lived MCP client for the Streamlit app. Streamlit reruns the whole script on every
+# interaction, so opening a session per prompt paid for the HTTP connection, the initialize
+# handshake and tool discovery each time. An MCPConnection keeps one session open on its own
+# event loop thread (client.py caches it with st.cache_resource); calls from any script run
+# are sent over it, and it reconnects once if the server went away in between. Only a call
+# that never reached a live session is sent again (see _stale); tool calls write files and
+# spend LLM quota, so anything else, a timeout included, is raised rather than replayed.
+
+SERVER_URL = os.getenv("MCP_SERVER_URL", "http://127.0.0.1:8000/mcp/")
+
+logger = logging.getLogger("drawio.client")
+
+# What the streamable HTTP transport reports when the server answers 404 for our session id,
+# i.e. it restarted and never saw the request.
+SESSION_TERMINATED = 32600
+
+
+def _stale(error):
+    if isinstance(error, McpError):
+        return error.error.code == SESSION_TERMINATED
+    # The session's streams were already closed, so the request was never sent.
+    return isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream))
+
+
+def result_text(result):
+    return "".join(block.text for block in result.content if getattr(block, "type", None) == "text")
+
+
+class MCPConnection:
+    def __init__(self, url=SERVER_URL):
+        self.url = url
+        self.tools = {}
+        self.connects = 0
+        self.calls = 0
+        self._session = None
+        self._stop = None
+        self._task = None
+        self._lock = None
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="mcp-client", daemon=True).start()
+
+    async def _hold(self, ready):
+        # The transport and the session are entered and exited by this one task: their anyio
+        # task groups have to be, and the task lives as long as the connection.
+        stop = asyncio.Event()
+        try:
+            async with streamablehttp_client(self.url) as (read, write, _):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.tools = {tool.name: tool for tool in (await session.list_tools()).tools}
+                    self._session, self._stop = session, stop
+                    ready.set_result(session)
+                    await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning("MCP session closed: %s", e)
+        finally:
+            if self._stop is stop:
+                self._session = self._stop = None
+
+    async def _connect(self, stale=None):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._session is not None and self._session is not stale:
+                return self._session
+            await self._close()
+            ready = self._loop.create_future()
+            self._task = asyncio.create_task(self._hold(ready))
+            session = await ready
+            self.connects += 1
+            return session
+
+    async def _close(self):
+        if self._stop is not None:
+            self._stop.set()
+        if self._task is not None:
+            await asyncio.wait([self._task], timeout=5)
+            self._task = None
+
+    async def _call(self, name, arguments, progress):
+        session = self._session or await self._connect()
+        try:
+            result = await session.call_tool(name, arguments, progress_callback=progress)
+        except Exception as e:
+            if not _stale(e):
+                raise
+            logger.info("MCP call failed (%s), reconnecting", e)
+            session = await self._connect(stale=session)
+            result = await session.call_tool(name, arguments, progress_callback=progress)
+        self.calls += 1
+        return result_text(result)
+
+    def call(self, name, arguments, on_progress=None):
+        """Call tool `name` and return its text; blocks the calling (script) thread.
+
+        `on_progress(message)` runs on the calling thread, where Streamlit elements can be
+        updated, for every progress notification the tool sends.
+        """
+        updates = queue.SimpleQueue()
+
+        async def progress(progress, total, message):
+            updates.put(message)
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._call(name, arguments, progress if on_progress else None), self._loop)
+        if on_progress is None:
+            return future.result()
+        while True:
+            done = future.done()
+            while not updates.empty():
+                on_progress(updates.get())
+            if done:
+                return future.result()
+            try:
+                on_progress(updates.get(timeout=0.05))
+            except queue.Empty:
+                pass
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def stats(self):
+        return {"url": self.url, "connects": self.connects, "calls": self.calls, "tools": sorted(self.tools)}
+
+
+def call_once(name, arguments, url=SERVER_URL):
+    # A throwaway session per call, as the client used to do; kept for comparison in benchmarks.
+    async def run():
+        async with streamablehttp_client(url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                await session.list_tools()
+                return result_text(await session.call_tool(name, arguments))
+
+    return asyncio.run(run())
@@ -0,0 +1,327 @@
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Pipeline observability: Prometheus text-format metrics (served at /metrics) and one
+# JSON log line per run with where its time and tokens went. Nodes are wrapped with
+# `instrument`; LLM token usage arrives through the per-run RunTrace callback handler.
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+_lock = Lock()
+_metrics = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(name, labels, value):
+    if labels:
+        name += "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return f"{name} {value}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = defaultdict(float)
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with _lock:
+            self._values[key] += amount
+
+    def total(self):
+        return sum(self._values.values())
+
+    def totals(self, *labels):
+        # Values summed over every other label, keyed by the values of `labels`.
+        index = [self.labels.index(label) for label in labels]
+        result = defaultdict(float)
+        with _lock:
+            for key, value in self._values.items():
+                result[tuple(key[i] for i in index)] += value
+        return dict(result)
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield _format(self.name, zip(self.labels, key), value)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, tuple(labels), tuple(buckets)
+        self._values = {}
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with _lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        for key, (counts, total) in sorted(self._values.items()):
+            labels = list(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else str(bound)
+                yield _format(f"{self.name}_bucket", labels + [("le", le)], cumulative)
+            yield _format(f"{self.name}_sum", labels, total)
+            yield _format(f"{self.name}_count", labels, cumulative)
+
+
+class Gauge:
+    """Read at scrape time from `fn`, for state other modules already track."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, fn):
+        self.name, self.help, self.fn = name, help, fn
+        _metrics.append(self)
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return
+        if value is not None:
+            yield _format(self.name, (), value)
+
+
+def gauge(name, help, fn):
+    return Gauge(name, help, fn)
+
+
+def render():
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+RUNS = Counter("drawio_runs_total", "Pipeline runs by final status.", ("status",))
+RUN_SECONDS = Histogram("drawio_run_duration_seconds", "Wall time per pipeline run.", ("status",))
+NODE_SECONDS = Histogram("drawio_node_duration_seconds", "Wall time per LangGraph node.", ("node",))
+NODE_FAILURES = Counter("drawio_node_failures_total", "Errors caught inside a node.", ("node",))
+LLM_CALLS = Counter("drawio_llm_calls_total", "LLM calls by node, model and outcome.", ("node", "model", "status"))
+LLM_TOKENS = Counter("drawio_llm_tokens_total", "LLM tokens by node, model and kind (prompt, cached_prompt, completion).", ("node", "model", "kind"))
+LLM_FIRST_TOKEN_SECONDS = Histogram("drawio_llm_first_token_seconds", "Time from request to first streamed token, by node.", ("node",))
+RETRIES = Counter("drawio_retries_total", "Retried attempts inside a node.", ("node",))
+VALIDATION = Counter("drawio_validation_total", "Outcome of the verify stage.", ("outcome",))
+FALLBACKS = Counter("drawio_llm_fallbacks_total", "Model tiers abandoned for the next one, by stage, model and reason.", ("stage", "model", "reason"))
+HEDGES = Counter("drawio_llm_hedges_total", "Hedged requests started because a model ran past its latency percentile.", ("stage", "model", "hedge"))
+ROUTES = Counter("drawio_route_decisions_total", "Conditional-edge decisions by router, target and reason.", ("router", "decision", "reason"))
+RUN_LLM_CALLS = Histogram("drawio_run_llm_calls", "LLM calls made per pipeline run.", buckets=(0, 1, 2, 3, 4, 5, 8))
+XML_BYTES = Histogram("drawio_xml_bytes", "Size of the diagrams returned.", buckets=SIZE_BUCKETS)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname.lower(), "event": record.getMessage()}
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+logger = logging.getLogger("drawio")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter("%(levelname)s %(message)s %(fields)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+def log(event, level=logging.INFO, **fields):
+    run = current_run.get()
+    if run is not None:
+        fields.setdefault("run_id", run.run_id)
+    logger.log(level, event, extra={"fields": fields})
+
+
+class RunTrace(BaseCallbackHandler):
+    """Per-run record; also the callback handler that collects that run's token usage."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex
+        self.started = time.perf_counter()
+        self.status = "ok"
+        self.nodes = defaultdict(float)
+        self.tokens = defaultdict(lambda: {"prompt": 0, "cached_prompt": 0, "completion": 0})
+        self.retries = defaultdict(int)
+        self.errors = []
+        self.validation = None
+        self.xml_bytes = None
+        self.llm_calls = 0
+        self.routes = []
+        self._llm_runs = {}
+        self._llm_started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        # Graph nodes are tagged by LangGraph; tools that call a chain directly pass {"node": ...}.
+        node = metadata.get("langgraph_node") or metadata.get("node", "")
+        self._llm_runs[run_id] = (node, metadata.get("ls_model_name", ""))
+        self._llm_started[run_id] = time.perf_counter()
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        started = self._llm_started.pop(run_id, None)
+        if started is not None:
+            LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started, node=self._llm_runs.get(run_id, ("",))[0])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        node, model = self._llm_runs.pop(run_id, ("", ""))
+        self._llm_started.pop(run_id, None)
+        LLM_CALLS.inc(node=node, model=model, status="ok")
+        self.llm_calls += 1
+        usage = None
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or usage
+        if not usage:
+            return
+        prompt, completion = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        # Prompt tokens the provider served from its prefix cache (a subset of `prompt`).
+        cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        LLM_TOKENS.inc(prompt, node=node, model=model, kind="prompt")
+        LLM_TOKENS.inc(cached, node=node, model=model, kind="cached_prompt")
+        LLM_TOKENS.inc(completion, node=node, model=model, kind="completion")
+        self.tokens[node]["prompt"] += prompt
+        self.tokens[node]["cached_prompt"] += cached
+        self.tokens[node]["completion"] += completion
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        node, model = self._llm_runs.pop(run_id, ("", ""))
+        self._llm_started.pop(run_id, None)
+        LLM_CALLS.inc(node=node, model=model, status="error")
+        self.llm_calls += 1
+
+    def summary(self):
+        return {
+            "status": self.status,
+            "duration_ms": round(1000 * (time.perf_counter() - self.started), 1),
+            "nodes_ms": {node: round(1000 * seconds, 1) for node, seconds in self.nodes.items()},
+            "tokens": dict(self.tokens),
+            "llm_calls": self.llm_calls,
+            "routes": self.routes,
+            "retries": dict(self.retries),
+            "validation": self.validation,
+            "xml_bytes": self.xml_bytes,
+            "errors": self.errors,
+        }
+
+
+current_run: ContextVar = ContextVar("current_run", default=None)
+
+
+@contextmanager
+def trace_run(**fields):
+    # Node tasks inherit the context, so nodes and helpers find the run via current_run.
+    trace = RunTrace()
+    token = current_run.set(trace)
+    try:
+        yield trace
+    except Exception as e:
+        trace.status = "error"
+        trace.errors.append(str(e))
+        raise
+    finally:
+        elapsed = time.perf_counter() - trace.started
+        RUNS.inc(status=trace.status)
+        RUN_SECONDS.observe(elapsed, status=trace.status)
+        if trace.status != "cached":
+            RUN_LLM_CALLS.observe(trace.llm_calls)
+        log("run", logging.INFO if trace.status != "error" else logging.ERROR, **fields, **trace.summary())
+        current_run.reset(token)
+
+
+def instrument(node):
+    def decorate(fn):
+        @wraps(fn)  # keeps the signature LangGraph inspects to decide whether to pass `config`
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                NODE_SECONDS.observe(elapsed, node=node)
+                run = current_run.get()
+                if run is not None:
+                    run.nodes[node] += elapsed
+        return wrapper
+    return decorate
+
+
+def node_error(node, error):
+    NODE_FAILURES.inc(node=node)
+    run = current_run.get()
+    if run is not None:
+        run.errors.append(f"{node}: {error}")
+    log("node_error", logging.ERROR, node=node, error=str(error), error_type=type(error).__name__)
+
+
+def retry(node, reason):
+    RETRIES.inc(node=node)
+    run = current_run.get()
+    if run is not None:
+        run.retries[node] += 1
+    log("retry", logging.WARNING, node=node, reason=str(reason))
+
+
+def route(router, decision, reason):
+    ROUTES.inc(router=router, decision=decision, reason=reason)
+    run = current_run.get()
+    if run is not None:
+        run.routes.append(f"{router}:{decision}:{reason}")
+
+
+def fallback(stage, model, reason, error=None):
+    FALLBACKS.inc(stage=stage, model=model, reason=reason)
+    log("llm_fallback", logging.WARNING, stage=stage, model=model, reason=reason, error=str(error) if error else None)
+
+
+def hedge(stage, model, hedge_model):
+    HEDGES.inc(stage=stage, model=model, hedge=hedge_model)
+    log("llm_hedge", stage=stage, model=model, hedge=hedge_model)
+
+
+def validation(outcome, fixes=0):
+    VALIDATION.inc(outcome=outcome)
+    run = current_run.get()
+    if run is not None:
+        run.validation = {"outcome": outcome, "fixes": fixes}
+
+
+def xml_size(xml):
+    size = len(xml.encode("utf-8"))
+    XML_BYTES.observe(size)
+    run = current_run.get()
+    if run is not None:
+        run.xml_bytes = size
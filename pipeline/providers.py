@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import Any, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from pipeline.tokens import approx_tokens
+from prompts.shared_prompt import drawio_rules
+
+# LLM backends behind registry.get_llm. Models are named "provider:model" ("groq:llama-3.1-8b-instant");
+# a bare name is a Gemini model. `LLM_PROVIDER` picks how they are served:
+#
+#   live    each model by its own provider, Gemini or Groq (the default; needs their API keys)
+#   fake    deterministic offline responses for each stage, with injected latency
+#   record  calls the live provider and saves every response under LLM_CASSETTE_DIR
+#   replay  answers from LLM_CASSETTE_DIR only, with recorded or injected latency
+#
+# A provider is just `model -> chat model`, the factory registry.set_llm_factory takes.
+
+PROVIDER = os.getenv("LLM_PROVIDER", "live")
+CASSETTE_DIR = os.getenv("LLM_CASSETTE_DIR", os.path.join(".cache", "cassettes"))
+FAKE_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0"))
+FAKE_NODES = int(os.getenv("FAKE_LLM_NODES", "12"))
+# "recorded" replays each response with the latency it originally had; a number overrides it.
+REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "recorded")
+STREAM_CHUNK_CHARS = 64
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+def _usage(messages, text):
+    prompt = sum(approx_tokens(str(m.content)) for m in messages)
+    completion = approx_tokens(text)
+    return {"input_tokens": prompt, "output_tokens": completion, "total_tokens": prompt + completion}
+
+
+# Models that have already seen the shared rules prefix, for FakeChatModel's cache accounting.
+_warm_prefixes = set()
+
+
+class _ChunkedChatModel(BaseChatModel):
+    """Answers with `_respond(messages) -> (text, usage, latency)`; streams it in fixed chunks."""
+
+    model: str = "offline"
+
+    def _respond(self, messages):
+        raise NotImplementedError
+
+    async def _arespond(self, messages):
+        return self._respond(messages)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text, usage, latency = self._respond(messages)
+        time.sleep(latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        text, usage, latency = await self._arespond(messages)
+        await asyncio.sleep(latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        # The whole latency goes before the first chunk; the rest only yields to the event loop.
+        text, usage, latency = await self._arespond(messages)
+        chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+        await asyncio.sleep(latency)
+        for i, piece in enumerate(chunks):
+            await asyncio.sleep(0)
+            last = i == len(chunks) - 1
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage if last else None))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+
+    @property
+    def _identifying_params(self):
+        return {"model": self.model}
+
+
+def _stage(messages):
+    # Which prompt this is, recognised by its system message.
+    from pipeline import registry
+    system = str(messages[0].content) if messages else ""
+    for name in registry.PROMPT_SPECS:
+        if system == registry.get_prompt(name).messages[0].format().content:
+            return name
+    return None
+
+
+def fake_topology(prompt, nodes=FAKE_NODES):
+    """A small layered architecture, seeded by the prompt so the same prompt gives the same diagram."""
+    from diagram.styles import NODE_STYLES
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    groups = [{"id": f"g{i}", "label": f"Tier {i + 1}", "parent": "app"} for i in range(max(1, nodes // 4))]
+    spec = {"direction": "LR", "layers": [{"id": "app", "name": "Application"}], "groups": groups, "nodes": [], "edges": []}
+    for i in range(nodes):
+        spec["nodes"].append({"id": f"n{i}", "label": f"Component {i + 1}", "style": rng.choice(NODE_STYLES),
+                              "parent": groups[i * len(groups) // nodes]["id"]})
+        if i:
+            spec["edges"].append([f"n{rng.randrange(i)}", f"n{i}"])
+    return spec
+
+
+class FakeChatModel(_ChunkedChatModel):
+    """Deterministic offline stand-in: a plan, valid XML, topology JSON, or the verify input echoed."""
+
+    latency: float = FAKE_LATENCY
+    nodes: int = FAKE_NODES
+
+    @property
+    def _llm_type(self):
+        return "fake-drawio"
+
+    def _respond(self, messages):
+        from diagram.layout import topology_to_xml
+        stage = _stage(messages)
+        request = str(messages[-1].content) if messages else ""
+        if stage == "plan":
+            text = f"Draw a layered architecture with {self.nodes} components for: {request[-200:]}"
+        elif stage == "code":
+            text = topology_to_xml(fake_topology(request, self.nodes))
+        elif stage == "topology":
+            text = json.dumps(fake_topology(request, self.nodes))
+        elif stage == "edit":
+            # One new component, connected to the first node of the summary.
+            change = request.rpartition("Requested change:\n")[2].strip() or "New component"
+            first = re.search(r"^node (\S+)", request, re.MULTILINE)
+            patch = {"nodes": [{"id": "added", "label": change[:40], "style": "Logic/Modules"}]}
+            if first:
+                patch["edges"] = [[first.group(1), "added"]]
+            text = json.dumps(patch)
+        else:
+            # Verify: echo the XML back, without the list of problems that follows it.
+            end = request.rfind("</mxGraphModel>")
+            text = request[:end + len("</mxGraphModel>")] if end != -1 else request
+        usage = _usage(messages, text)
+        if messages and str(messages[0].content).startswith(drawio_rules):
+            # Report the shared rules as cache reads once this model has seen them, like
+            # Gemini implicit caching and Groq prompt caching do for a repeated prefix.
+            if self.model in _warm_prefixes:
+                usage["input_token_details"] = {"cache_read": approx_tokens(drawio_rules)}
+            _warm_prefixes.add(self.model)
+        return text, usage, self.latency
+
+
+class RecordReplayChatModel(_ChunkedChatModel):
+    """Replays responses saved under `directory`, keyed on model and the exact messages.
+
+    With `inner` set, misses are forwarded to it and recorded; without it a miss raises
+    CassetteMiss, so replay runs never reach the network.
+    """
+
+    directory: str = CASSETTE_DIR
+    inner: Optional[Any] = None
+    latency: Optional[float] = None
+
+    @property
+    def _llm_type(self):
+        return "record-replay"
+
+    def _path(self, messages):
+        payload = json.dumps([self.model, messages_to_dict(messages)], sort_keys=True)
+        return os.path.join(self.directory, hashlib.sha256(payload.encode("utf-8")).hexdigest() + ".json")
+
+    def _load(self, path):
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+        latency = entry.get("latency", 0.0) if self.latency is None else self.latency
+        return entry["content"], entry.get("usage"), latency
+
+    def _save(self, path, text, usage, latency):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "content": text, "usage": usage, "latency": latency}, f)
+        os.replace(tmp, path)
+
+    def _respond(self, messages):
+        path = self._path(messages)
+        if os.path.exists(path):
+            return self._load(path)
+        if self.inner is None:
+            raise CassetteMiss(f"no recorded response for this prompt in {self.directory}")
+        start = time.perf_counter()
+        result = self.inner.invoke(messages)
+        return self._record(path, messages, result, time.perf_counter() - start)
+
+    async def _arespond(self, messages):
+        path = self._path(messages)
+        if os.path.exists(path):
+            return self._load(path)
+        if self.inner is None:
+            raise CassetteMiss(f"no recorded response for this prompt in {self.directory}")
+        start = time.perf_counter()
+        result = await self.inner.ainvoke(messages)
+        return self._record(path, messages, result, time.perf_counter() - start)
+
+    def _record(self, path, messages, result, elapsed):
+        text = result.content if hasattr(result, "content") else str(result)
+        usage = getattr(result, "usage_metadata", None) or _usage(messages, text)
+        self._save(path, text, dict(usage), elapsed)
+        return text, usage, 0.0  # the real call already took that long
+
+
+def google(model):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from pipeline.registry import get_rate_limiter
+    return ChatGoogleGenerativeAI(model=model, rate_limiter=get_rate_limiter("google"))
+
+
+def groq(model):
+    from langchain_groq import ChatGroq
+    from pipeline.registry import get_rate_limiter
+    return ChatGroq(model=model, rate_limiter=get_rate_limiter("groq"))
+
+
+LIVE = {"google": google, "groq": groq}
+
+
+def live(model):
+    provider, _, name = model.rpartition(":")
+    provider = provider or "google"
+    if provider not in LIVE:
+        raise ValueError(f"unknown model provider {provider!r} in {model!r}; expected one of {', '.join(LIVE)}")
+    return LIVE[provider](name)
+
+
+def fake(model):
+    return FakeChatModel(model=model)
+
+
+def record(model):
+    return RecordReplayChatModel(model=model, inner=live(model))
+
+
+def replay(model):
+    latency = None if REPLAY_LATENCY == "recorded" else float(REPLAY_LATENCY)
+    return RecordReplayChatModel(model=model, latency=latency)
+
+
+PROVIDERS = {"live": live, "fake": fake, "record": record, "replay": replay}
+
+
+def get_provider(name=None):
+    name = name or PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(f"unknown LLM_PROVIDER {name!r}; expected one of {', '.join(PROVIDERS)}")
+    return PROVIDERS[name]
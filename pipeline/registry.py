@@ -0,0 +1,185 @@
+from prompts.system_prompt import system_message
+from prompts.verify_code_prompt import verify_code_prompt
+from prompts.topology_prompt import topology_message
+from prompts.edit_prompt import edit_message
+from threading import Lock
+import os
+
+DEFAULT_MODEL = "gemini-2.5-flash-preview-05-20"
+# Stages that tolerate a smaller, faster model when GROQ_API_KEY is set; Gemini stays as the fallback.
+FAST_MODELS = {
+    "plan": "groq:llama-3.1-8b-instant",
+    "verify": "groq:llama-3.3-70b-versatile",
+    "edit": "groq:llama-3.3-70b-versatile",
+}
+
+# Process-lifetime registry: prompt templates, LLM clients and compiled graphs are
+# built once (on first use) and shared by every request. langchain_core's prompt and
+# runnable modules are imported on that first use too, not when the server starts.
+
+PROMPT_SPECS = {
+    "plan": (
+        "You are the first node in a chain of xml generating system. Simplify the user's input into structured instructions for the next nodes. Be clear and avoid mistakes.",
+        "Based on {user_prompt} generate clear and detailed instructions to generate xml code for the user's workflow.",
+    ),
+    "code": (
+        system_message,
+        "Based on the following input, generate XML code for draw.io:\n\n{input}",
+    ),
+    "topology": (
+        topology_message,
+        "Based on the following input, describe the diagram topology as JSON:\n\n{input}",
+    ),
+    "edit": (
+        edit_message,
+        "Current diagram:\n{summary}\n\nRequested change:\n{change}",
+    ),
+    "verify": (
+        verify_code_prompt,
+        "{input}\n\nThe validator could not repair these problems. Fix them and keep everything else unchanged:\n{errors}",
+    ),
+}
+
+_lock = Lock()
+_prompts = {}
+_llms = {}
+_chains = {}
+_graphs = {}
+_rate_limiters = {}
+
+
+def get_rate_limiter(provider):
+    # Shared by every client of `provider`; <PROVIDER>_REQUESTS_PER_SECOND unset or 0 means unlimited.
+    if provider not in _rate_limiters:
+        rps = float(os.getenv(f"{provider.upper()}_REQUESTS_PER_SECOND", "0"))
+        limiter = None
+        if rps > 0:
+            from langchain_core.rate_limiters import InMemoryRateLimiter
+            limiter = InMemoryRateLimiter(requests_per_second=rps, check_every_n_seconds=0.05, max_bucket_size=max(1, rps))
+        _rate_limiters[provider] = limiter
+    return _rate_limiters[provider]
+
+
+def _default_llm_factory(model):
+    # LLM_PROVIDER (pipeline/providers.py) picks Gemini, the offline fake or record/replay.
+    from pipeline import providers
+    return providers.get_provider()(model)
+
+
+_llm_factory = _default_llm_factory
+
+
+def set_llm_factory(factory):
+    # Swap how LLM clients are built (e.g. a stub for benchmarks) and drop cached clients.
+    global _llm_factory
+    with _lock:
+        _llm_factory = factory or _default_llm_factory
+        _llms.clear()
+        _chains.clear()
+
+
+def get_prompt(name):
+    prompt = _prompts.get(name)
+    if prompt is None:
+        with _lock:
+            prompt = _prompts.get(name)
+            if prompt is None:
+                from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+                system, human = PROMPT_SPECS[name]
+                prompt = ChatPromptTemplate.from_messages([
+                    SystemMessagePromptTemplate.from_template(system),
+                    HumanMessagePromptTemplate.from_template(human),
+                ])
+                _prompts[name] = prompt
+    return prompt
+
+
+def get_llm(model=DEFAULT_MODEL):
+    # One client per model so all requests share its underlying HTTP connection pool.
+    llm = _llms.get(model)
+    if llm is None:
+        with _lock:
+            llm = _llms.get(model)
+            if llm is None:
+                llm = _llm_factory(model)
+                _llms[model] = llm
+    return llm
+
+
+def model_tiers(name):
+    # MODEL_<STAGE>="groq:llama-3.1-8b-instant,gemini-2.5-flash" overrides; read on use so .env applies.
+    configured = os.getenv(f"MODEL_{name.upper()}")
+    if configured:
+        return [model.strip() for model in configured.split(",") if model.strip()]
+    if name in FAST_MODELS and os.getenv("GROQ_API_KEY"):
+        return [FAST_MODELS[name], DEFAULT_MODEL]
+    return [DEFAULT_MODEL]
+
+
+def output_mode():
+    # DIAGRAM_OUTPUT_MODE, read on use like the tiers. "xml": the model writes full draw.io
+    # XML; "topology": it writes compact JSON and the layout engine computes geometry (the
+    # code stage falls back to "xml" if the JSON is unusable).
+    return os.getenv("DIAGRAM_OUTPUT_MODE", "xml")
+
+
+# Stages whose models can shape each kind of cached result (pipeline/cache.py).
+RESULT_STAGES = {
+    "plan": ("plan",),
+    "diagram": ("plan", "code", "topology", "verify"),
+}
+
+
+def stage_models(stage):
+    return {name: model_tiers(name) for name in RESULT_STAGES.get(stage, (stage,))}
+
+
+def llm_backend():
+    # Where answers come from: the LLM_PROVIDER name, or the factory a benchmark swapped in.
+    if _llm_factory is _default_llm_factory:
+        from pipeline import providers
+        return providers.PROVIDER
+    return f"{_llm_factory.__module__}.{getattr(_llm_factory, '__qualname__', type(_llm_factory).__name__)}"
+
+
+def get_chain(name, tier=0):
+    # `tier` skips the first models, so a retry after a validation failure starts on a stronger one.
+    models = model_tiers(name)
+    models = models[min(tier, len(models) - 1):]
+    key = (name, tuple(models))
+    chain = _chains.get(key)
+    if chain is None:
+        from pipeline.tiering import TieredModel, non_empty
+        accept = None if name == "code" else non_empty
+        chain = get_prompt(name) | TieredModel(name, [(model, get_llm(model)) for model in models], accept)
+        with _lock:
+            chain = _chains.setdefault(key, chain)
+    return chain
+
+
+def warm(names=None):
+    # Build the chains, and so import the configured providers' packages, before the first request.
+    for name in names or PROMPT_SPECS:
+        get_chain(name)
+
+
+def get_graph(name, builder, checkpointer=None):
+    # `builder` is a StateGraph or a function returning one, called only on the first use.
+    graph = _graphs.get(name)
+    if graph is None:
+        with _lock:
+            graph = _graphs.get(name)
+            if graph is None:
+                if callable(builder):
+                    builder = builder()
+                graph = builder.compile(checkpointer=checkpointer)
+                _graphs[name] = graph
+    return graph
+
+
+def clear():
+    with _lock:
+        _prompts.clear()
+        _llms.clear()
+        _chains.clear()
+        _graphs.clear()
@@ -0,0 +1,41 @@
+import os
+import re
+
+# Decisions for the graph's conditional edges. The planner is only worth an LLM call
+# when the prompt is a loose description; short prompts and prompts that already list
+# their components or connections go straight to the code stage.
+
+PLAN_SKIP_MAX_WORDS = int(os.getenv("PLAN_SKIP_MAX_WORDS", "12"))
+VERIFY_REPAIR_ATTEMPTS = int(os.getenv("VERIFY_REPAIR_ATTEMPTS", "2"))
+STRUCTURED_MIN_ITEMS = 3
+
+_LIST_ITEM = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+\S", re.MULTILINE)
+_ARROW = re.compile(r"->|→|=>")
+
+
+def is_structured(prompt):
+    # Bulleted/numbered component lists or "a -> b" connections, or a JSON/XML description.
+    text = prompt.strip()
+    if text.startswith(("{", "<")):
+        return True
+    return len(_LIST_ITEM.findall(text)) >= STRUCTURED_MIN_ITEMS or len(_ARROW.findall(text)) >= STRUCTURED_MIN_ITEMS - 1
+
+
+def needs_plan(prompt):
+    prompt = prompt or ""
+    if PLAN_SKIP_MAX_WORDS > 0 and len(prompt.split()) <= PLAN_SKIP_MAX_WORDS:
+        return False, "short"
+    if is_structured(prompt):
+        return False, "structured"
+    return True, "plan"
+
+
+def after_verify(errors, attempts, has_xml):
+    """"repair" while errors remain and the retry budget allows it, otherwise "done"."""
+    if not errors:
+        return "done", "valid"
+    if not has_xml:
+        return "done", "no_xml"
+    if attempts >= VERIFY_REPAIR_ATTEMPTS:
+        return "done", "budget_exhausted"
+    return "repair", "invalid"
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+from langchain_core.runnables import Runnable
+
+from pipeline import metrics
+
+# An ordered list of models for one stage, fastest first. A call goes to the first model;
+# the next one takes over when it errors, times out or returns something `accept` rejects.
+# If the first model is slower than its own recent HEDGE_PERCENTILE latency, the next
+# model is started alongside it (a hedged request) and whichever answers first wins.
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))  # 0 disables hedging
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_SECONDS = float(os.getenv("HEDGE_DEFAULT_SECONDS", "10"))
+
+
+class LatencyTracker:
+    def __init__(self, size=200):
+        self._samples = {}
+        self.size = size
+
+    def record(self, key, seconds):
+        self._samples.setdefault(key, deque(maxlen=self.size)).append(seconds)
+
+    def hedge_delay(self, key):
+        samples = self._samples.get(key)
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_SECONDS
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(HEDGE_PERCENTILE * len(ordered)))]
+
+
+latencies = LatencyTracker()
+
+
+class TimeoutFallback(Exception):
+    pass
+
+
+class RejectedOutput(Exception):
+    pass
+
+
+def non_empty(result):
+    return bool(getattr(result, "content", result))
+
+
+class TieredModel(Runnable):
+    """Chat-model runnable over `models` ([(spec, llm), ...]) with fallback and hedging."""
+
+    def __init__(self, stage, models, accept=None):
+        self.stage = stage
+        self.models = list(models)
+        self.accept = accept
+
+    def invoke(self, input, config=None, **kwargs):
+        # Synchronous callers get plain sequential fallback.
+        error = None
+        for spec, llm in self.models:
+            try:
+                result = llm.invoke(input, config, **kwargs)
+            except Exception as e:
+                error = e
+                metrics.fallback(self.stage, spec, type(e).__name__)
+                continue
+            if self.accept is None or self.accept(result):
+                return result
+            error = RejectedOutput(f"{spec} returned an unusable response")
+            metrics.fallback(self.stage, spec, "rejected")
+        raise error
+
+    async def _call(self, spec, llm, input, config):
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(llm.ainvoke(input, config), LLM_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise TimeoutFallback(f"{spec} took longer than {LLM_TIMEOUT_SECONDS}s")
+        latencies.record(spec, time.perf_counter() - start)
+        if self.accept is not None and not self.accept(result):
+            raise RejectedOutput(f"{spec} returned an unusable response")
+        return result
+
+    async def _first_chunk(self, spec, llm, input, config):
+        # Races on time to first token; the winner's stream is relayed by astream.
+        start = time.perf_counter()
+        stream = llm.astream(input, config)
+        try:
+            chunk = await asyncio.wait_for(stream.__anext__(), LLM_TIMEOUT_SECONDS)
+        except BaseException as e:
+            await stream.aclose()
+            if isinstance(e, asyncio.TimeoutError):
+                raise TimeoutFallback(f"{spec} sent nothing for {LLM_TIMEOUT_SECONDS}s")
+            raise
+        latencies.record(f"{spec}:first_chunk", time.perf_counter() - start)
+        return chunk, stream
+
+    async def _race(self, start, latency_key):
+        pending, error, hedged = {}, None, False
+        remaining = list(self.models)
+
+        def launch():
+            spec, llm = remaining.pop(0)
+            pending[asyncio.ensure_future(start(spec, llm))] = spec
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if remaining and not hedged and len(pending) == 1 and HEDGE_PERCENTILE > 0:
+                    timeout = latencies.hedge_delay(latency_key(next(iter(pending.values()))))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    metrics.hedge(self.stage, next(iter(pending.values())), remaining[0][0])
+                    launch()
+                    continue
+                for task in done:
+                    spec = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                    reason = "timeout" if isinstance(error, TimeoutFallback) else "rejected" if isinstance(error, RejectedOutput) else "error"
+                    metrics.fallback(self.stage, spec, reason, error)
+                if not pending and remaining:
+                    launch()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                losers = await asyncio.gather(*pending, return_exceptions=True)
+                for result in losers:
+                    if isinstance(result, tuple):  # a stream that lost the race
+                        await result[1].aclose()
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await self._race(lambda spec, llm: self._call(spec, llm, input, config), lambda spec: spec)
+
+    async def astream(self, input, config=None, **kwargs):
+        chunk, stream = await self._race(
+            lambda spec, llm: self._first_chunk(spec, llm, input, config),
+            lambda spec: f"{spec}:first_chunk",
+        )
+        try:
+            yield chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
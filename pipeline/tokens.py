@@ -0,0 +1,61 @@
+import re
+
+from pipeline import metrics
+from pipeline.registry import PROMPT_SPECS
+from prompts.shared_prompt import drawio_rules
+
+# Prompt-token accounting per pipeline node. `prompt_sizes` measures the static part of
+# each stage's prompt (what every call pays before the request text) and how much of it
+# is the shared rules prefix that providers can serve from their prefix cache; `usage`
+# reads the tokens providers reported per node since startup.
+
+# The graph node (or tool) that sends each stage's prompt.
+NODES = {
+    "plan": "generate_plan",
+    "code": "generate_code",
+    "topology": "generate_code",
+    "verify": "repair_code",
+    "edit": "edit_diagram",
+}
+
+_PLACEHOLDER = re.compile(r"\{\w+\}")
+
+
+def approx_tokens(text):
+    # About four characters per token for English and XML; close enough to compare prompts.
+    return max(1, len(text) // 4) if text else 0
+
+
+def prompt_sizes():
+    sizes = {}
+    for stage, (system, human) in PROMPT_SPECS.items():
+        shared = drawio_rules if system.startswith(drawio_rules) else ""
+        sizes[stage] = {
+            "node": NODES.get(stage, stage),
+            "system_tokens": approx_tokens(system),
+            "cacheable_prefix_tokens": approx_tokens(shared),
+            "template_tokens": approx_tokens(_PLACEHOLDER.sub("", human)),
+        }
+    return sizes
+
+
+def usage():
+    calls = metrics.LLM_CALLS.totals("node")
+    tokens = metrics.LLM_TOKENS.totals("node", "kind")
+    report = {}
+    for (node,), count in sorted(calls.items()):
+        prompt = tokens.get((node, "prompt"), 0)
+        cached = tokens.get((node, "cached_prompt"), 0)
+        report[node or "unknown"] = {
+            "calls": int(count),
+            "prompt_tokens": int(prompt),
+            "cached_prompt_tokens": int(cached),
+            "completion_tokens": int(tokens.get((node, "completion"), 0)),
+            "prompt_tokens_per_call": round(prompt / count, 1),
+            "cache_hit_rate": round(cached / prompt, 3) if prompt else 0.0,
+        }
+    return report
+
+
+def report():
+    return {"prompts": prompt_sizes(), "usage": usage()}
@@ -0,0 +1,108 @@
+# Rules shared by the generation (system_prompt.py) and repair (verify_code_prompt.py)
+# prompts. Both start with this text, unchanged and before anything stage-specific, so
+# Gemini implicit caching and Groq prompt caching can serve it from cache across both
+# stages; keep anything that varies per stage or per request after it.
+drawio_rules = """
+Every Draw.io diagram produced or repaired here follows the rules below.
+
+===========================
+OUTPUT PROTOCOL (CRITICAL)
+===========================
+- OUTPUT PURE, RAW XML. NOTHING ELSE: no explanations, no comments, no conversational text.
+- ABSOLUTELY NO MARKDOWN CODE FENCES (e.g., ```xml, ```) at the start or end.
+- The output MUST begin with `<?xml version="1.0" encoding="UTF-8"?>` and end with `</mxGraphModel>`.
+- The XML must be 100 percent syntactically and structurally valid and import directly into Draw.io (diagrams.net) without errors.
+- STRICT STYLE ADHERENCE IS MANDATORY: Every `style` attribute MUST be exactly one style NAME from the "VALID STYLE LIST" below (e.g. `style="Logic/Modules"`). The full style strings are applied afterwards. DO NOT write style strings, infer, or invent styles or colors.
+
+===========================
+MANDATORY XML STRUCTURE
+===========================
+
+1.  **Header & Root:**
+    Must begin exactly with:
+    `<?xml version="1.0" encoding="UTF-8"?>`
+    `<mxGraphModel dx="1434" dy="784" grid="1" gridSize="10" guides="1" tooltips="1" connect="1" arrows="1" fold="1" page="1" pageScale="1" pageWidth="850" pageHeight="1100" background="#000000">`
+    `<root>`
+
+2.  **Base Cells:**
+    These two must be present exactly as follows:
+    `<mxCell id="0"/>`
+    `<mxCell id="1" parent="0"/>`
+
+3.  **Vertex Cells (Nodes):**
+    Format:
+    `<mxCell id="..." value="..." style="..." vertex="1" parent="PARENT_ID"><mxGeometry ... as="geometry"/></mxCell>`
+    Rules:
+    -   ID (integer) must be unique and `>= 2`. IDs must increment sequentially without gaps.
+    -   `value` must contain the node's label and **must NOT be empty or None**.
+        -   For multi-line labels, use `<br>` (e.g., `Line1<br>Line2`).
+        -   For subordinate text within a label, use `<small>` (e.g., `Main Text<br><small>Sub Text</small>`).
+    -   `style` must be **exactly** one name from "VALID STYLE LIST" (e.g., `style="User/UI"`).
+    -   Must include `vertex="1"`.
+    -   **CRITICAL PARENTING:** `PARENT_ID` must be the ID of the logical layer OR visual group this node belongs to. **A node's `parent` MUST NEVER be `1` (the diagram root) unless it is a Layer cell (as defined in section 5). If a node is conceptually part of a group, its `parent` MUST be that `GROUP_ID`. NO EXCEPTIONS.**
+    -   Every `<mxGeometry>` tag must be present and valid. Its `x` and `y` coordinates must be positive integers.
+    -   Escape all special characters in `value` and other attributes: `&` → `&amp;`, `<` → `&lt;`, `>` → `&gt;`, `"` → `&quot;`.
+
+4.  **Edge Cells (Connections):**
+    Format:
+    `<mxCell id="..." value="" style="Edges" edge="1" parent="PARENT_ID" source="..." target="..."><mxGeometry relative="1" as="geometry"/></mxCell>`
+    Rules:
+    -   ID (integer) must be unique and continue sequentially from the last vertex ID.
+    -   `value` for edges **MUST be empty (`value=""`)**. **No text labels on edges.**
+    -   `style` must be exactly `style="Edges"`.
+    -   Must include `edge="1"`.
+    -   `source` and `target` attributes **must refer to valid, existing vertex IDs**.
+    -   **CRITICAL PARENTING:** `PARENT_ID` must be the ID of the logical layer OR visual group that *both* `source` and `target` nodes belong to. If different, parent to the lowest common logical parent (e.g., shared layer ID, or `1` as last resort).
+    -   **No `points` array, `entryX/Y`, or `exitX/Y` on edges**; the Edges style routes clean perimeter connections automatically.
+
+5.  **Layers (Logical Containers):**
+    -   Layers are **logical organizational containers, NOT visible shapes**. They group elements for show/hide functionality.
+    -   **Format Example:**
+        `<mxCell id="LAYER_ID" value="Layer Name" style="layer;name=Layer Name;visible=1;" parent="1">`
+        `  <mxGeometry x="0" y="0" width="0" height="0" as="geometry"/>`
+        `</mxCell>`
+    *Rules for Layer Cells:*
+    -   `value` and `name` in style **must be identical**; `visible=1` (default) or `visible=0` (hidden).
+    -   **`mxGeometry` MUST be fixed at `x="0" y="0" width="0" height="0"`. No exceptions.**
+    -   Layer cells themselves **must have `parent="1"`**.
+    -   **CRITICAL PARENT RULE:** All top-level groups and standalone nodes **MUST** have their `parent` set to a `LAYER_ID`, never `1`.
+
+6.  **Containers & Grouping (Visual Containers):**
+    -   Groups are **visible `mxCell` elements** that enclose and move with their child elements.
+    -   **Format Example:**
+        `<mxCell id="GROUP_ID" value="Group Name" style="Groups/Containers" vertex="1" parent="PARENT_ID_OF_GROUP">`
+        `  <mxGeometry x="START_X" y="START_Y" width="WIDTH" height="HEIGHT" as="geometry"/>`
+        `</mxCell>`
+    *Rules for Group Cells:*
+    -   `value` is the text label for the group; `style` must be exactly `style="Groups/Containers"`.
+    -   `PARENT_ID_OF_GROUP` must be the ID of the layer or parent group this group belongs to.
+    -   **CRITICAL GEOMETRY FOR GROUPS:** A group's `mxGeometry` MUST fully encompass *all* its child elements with **at least 20 pixels of padding on all sides**: `x = min_child_x - 20`, `y = min_child_y - 20`, `width = (max_child_x_plus_width - min_child_x) + 40`, `height = (max_child_y_plus_height - min_child_y) + 40`. Nodes MUST NOT touch or extend outside their parent group's boundary.
+    -   **CRITICAL PARENT RULE FOR GROUP CHILDREN:** All cells (vertices and edges) logically/visually within a group **MUST** have their `parent` set to that `GROUP_ID`, not `1` or a layer ID.
+    -   **Distinction:** Layers are *logical* (show/hide), groups are *visual* (boundaries, combined movement). A cell can belong to a layer AND a group.
+
+7.  **Final Tags:**
+    All output must close correctly:
+    `</root>`
+    `</mxGraphModel>`
+
+===========================
+VALID STYLE LIST (STRICTLY ADHERE TO THESE)
+===========================
+
+Use these names verbatim as the `style` value:
+
+-   `User/UI`
+-   `Logic/Modules`
+-   `Databases (Outline)`
+-   `Databases (Filled Blue)`
+-   `Databases (Filled Green)`
+-   `Databases (Filled Red)`
+-   `External APIs`
+-   `Queues`
+-   `Monitoring/Logging`
+-   `LLMs`
+-   `Groups/Containers`
+-   `Edges`
+
+Any cell whose style is not one of these names must be removed.
+"""
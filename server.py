@@ -1,23 +1,34 @@
-from mcp.server.fastmcp import FastMCP
-from langgraph.graph import StateGraph, START, END
-from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from prompts.system_prompt import system_message
-from prompts.verify_code_prompt import verify_code_prompt
-from langgraph.checkpoint.memory import MemorySaver
+from mcp.server.fastmcp import FastMCP, Context
+from starlette.responses import JSONResponse, PlainTextResponse
+from pipeline import registry, checkpoint, metrics, routing, tokens, artifacts
+from pipeline.export import exporter, FORMATS as EXPORT_FORMATS, URI_PREFIX as EXPORT_URI_PREFIX
+from pipeline.cache import results as result_cache
+from pipeline.concurrency import RequestLimiter, QueueFullError
+from diagram.validator import validate_and_repair, parse as parse_diagram
+from diagram.patch import summarize, parse_patch, apply_patch
+from diagram.stream import StreamCheck, stream_stats
+from diagram.styles import expand_style, compact_styles
+from diagram.layout import parse_topology, topology_to_xml
+from diagram.model import compress_chunks
 from dataclasses import dataclass, field
-from langchain_groq import ChatGroq
-import subprocess
-from typing import List, Any
+import base64
+from typing import List, Any, TYPE_CHECKING
 import os
 from dotenv import load_dotenv
 import json
+import asyncio
+import contextlib
+import threading
 import time
+import resource
+import logging
+import xml.etree.ElementTree as ET
 
 load_dotenv()
 
-os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
-os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
+if TYPE_CHECKING:
+    # A string annotation is enough for LangGraph to pass the run config to a node.
+    from langchain_core.runnables import RunnableConfig
 
 @dataclass
 class WorkflowState:
@@ -25,104 +36,459 @@ class WorkflowState:
     user_prompt: str = None
     code_instructions: str = None
     messages: List[Any] = field(default_factory=list)
+    use_cache: bool = True
+    validation_errors: List[str] = field(default_factory=list)
+    repair_attempts: int = 0
 
-memory = MemorySaver()
-graph_builder = StateGraph(WorkflowState)
+limiter = RequestLimiter(
+    max_concurrency=int(os.getenv("MAX_CONCURRENT_REQUESTS", "8")),
+    max_queue=int(os.getenv("MAX_QUEUED_REQUESTS", "32")),
+)
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "8"))
+BATCH_MAX_INPUTS = int(os.getenv("BATCH_MAX_INPUTS", "100"))
+CODE_STREAM_ATTEMPTS = int(os.getenv("CODE_STREAM_ATTEMPTS", "2"))
+# Load langgraph, the checkpoint saver and the configured LLM clients on a background thread
+# while the server starts listening, instead of on the first request.
+WARM_UP = os.getenv("STARTUP_WARM_UP", "1") == "1"
 
 # FastMCP server initialization
 mcp = FastMCP("DrawIO",host="0.0.0.0", port=8000)
 
-def generate_plan_node(state: WorkflowState):
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-preview-05-20")
-    prompt = ChatPromptTemplate.from_messages([
-        SystemMessagePromptTemplate.from_template(
-            "You are the first node in a chain of xml generating system. Simplify the user's input into structured instructions for the next nodes. Be clear and avoid mistakes."
-        ),
-        HumanMessagePromptTemplate.from_template(
-            "Based on {user_prompt} generate clear and detailed instructions to generate xml code for the user's workflow."
-        )
-    ])
-    chain = prompt | llm
+@metrics.instrument("generate_plan")
+async def generate_plan_node(state: WorkflowState):
+    # The plan is cached on its own so a retry that only needs new code reuses it. Like the
+    # diagram cache, it is neither read nor written when the caller bypasses caching.
+    if state.use_cache:
+        cached = await result_cache.get("plan", state.user_prompt)
+        if cached is not None:
+            state.code_instructions = cached
+            return state
+    chain = registry.get_chain("plan")
     try:
-        result = chain.invoke({"user_prompt": state.user_prompt})
+        result = await chain.ainvoke({"user_prompt": state.user_prompt})
         state.code_instructions = result.content if hasattr(result, "content") else str(result)
+        if state.code_instructions and state.use_cache:
+            await result_cache.set("plan", state.user_prompt, state.code_instructions)
     except Exception as e:
-        print(f"Error in generate_plan_node: {e}")
+        metrics.node_error("generate_plan", e)
         state.code_instructions = None
     return state
 
-def generate_code_node(state: WorkflowState):
-    prompt = ChatPromptTemplate.from_messages([
-        SystemMessagePromptTemplate.from_template(system_message),
-        HumanMessagePromptTemplate.from_template(
-            "Based on the following input, generate XML code for draw.io:\n\n{input}"
-        )
-    ])
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-preview-05-20")
-    chain = prompt | llm
+async def generate_topology(state: WorkflowState):
+    # The model only names nodes, groups and edges; geometry comes from the layout engine.
+    chain = registry.get_chain("topology")
     try:
-        result = chain.invoke({"input": state.code_instructions})
-        state.xml_code = result.content if hasattr(result, "content") else str(result)
+        result = await chain.ainvoke({"input": state.code_instructions or state.user_prompt})
+        spec = parse_topology(result.content if hasattr(result, "content") else str(result))
+        return topology_to_xml(spec)
     except Exception as e:
-        print(f"Error in generate_code_node: {e}")
-        state.xml_code = None
+        metrics.node_error("generate_topology", e)
+        return None
+
+@metrics.instrument("generate_code")
+async def generate_code_node(state: WorkflowState, config: "RunnableConfig"):
+    if registry.output_mode() == "topology":
+        state.xml_code = await generate_topology(state)
+        if state.xml_code is not None:
+            return state
+    # Stream the XML through incremental checks; abort and retry as soon as the model
+    # produces something the local validator can't repair.
+    progress = config.get("configurable", {}).get("progress")
+    # Without a plan (see route_start) the code stage works from the user's prompt directly.
+    base_instructions = state.code_instructions or state.user_prompt
+    instructions = base_instructions
+    for attempt in range(CODE_STREAM_ATTEMPTS):
+        # A retry after an unrepairable stream moves on to the stage's next model tier.
+        chain = registry.get_chain("code", tier=attempt)
+        # Only a stream that another attempt will replace is cut short; the last one is read to
+        # the end so verify/repair get the whole document instead of a truncated prefix.
+        last = attempt + 1 == CODE_STREAM_ATTEMPTS
+        check = StreamCheck()
+        parts = []
+        stream = chain.astream({"input": instructions})
+        try:
+            async for chunk in stream:
+                parts.append(chunk.content if hasattr(chunk, "content") else str(chunk))
+                for cell in check.feed(parts[-1]):
+                    if progress:
+                        # The model writes style names; the preview needs the full strings.
+                        if cell.get("style"):
+                            cell.set("style", expand_style(cell.get("style")))
+                        await progress({"stage": "generate_code", "attempt": attempt + 1,
+                                        "cells": check.cells, "cell": ET.tostring(cell, encoding="unicode")})
+                if check.fatal and not last:
+                    break
+        except Exception as e:
+            metrics.node_error("generate_code", e)
+            state.xml_code = None
+            return state
+        finally:
+            await stream.aclose()
+        check.close()
+        retry = check.fatal is not None and not last
+        stream_stats.record(check, "".join(parts), aborted=retry)
+        if not retry:
+            break
+        metrics.retry("generate_code", f"aborted attempt {attempt + 1}: {check.fatal}")
+        instructions = f"{base_instructions}\n\nA previous attempt was rejected because {check.fatal}. Do not repeat that mistake."
+    state.xml_code = "".join(parts)
+    return state
+
+def route_start(state: WorkflowState):
+    plan, reason = routing.needs_plan(state.user_prompt)
+    decision = "generate_plan" if plan else "generate_code"
+    metrics.route("start", decision, reason)
+    return decision
+
+@metrics.instrument("verify_code")
+async def verify_code_node(state: WorkflowState):
+    # Local check only; failures are routed to repair_code while the retry budget lasts.
+    if state.xml_code is None:
+        state.validation_errors = ["no XML was generated"]
+        metrics.validation("error")
+        return state
+    report = validate_and_repair(state.xml_code)
+    state.xml_code = report.xml or state.xml_code
+    state.validation_errors = report.errors
+    if report.ok:
+        metrics.validation("local" if state.repair_attempts == 0 else "llm_fixed", len(report.fixes))
+    elif state.repair_attempts >= routing.VERIFY_REPAIR_ATTEMPTS:
+        metrics.validation("unresolved", len(report.fixes))
     return state
 
-def verify_code_node(state: WorkflowState):
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-preview-05-20")
-    prompt = ChatPromptTemplate.from_messages([
-        SystemMessagePromptTemplate.from_template(
-            verify_code_prompt
-        ),
-        HumanMessagePromptTemplate.from_template("{input}")
-    ])
-    chain = prompt | llm
+def route_verify(state: WorkflowState):
+    decision, reason = routing.after_verify(state.validation_errors, state.repair_attempts, state.xml_code is not None)
+    metrics.route("verify", decision, reason)
+    return decision
+
+@metrics.instrument("repair_code")
+async def repair_code_node(state: WorkflowState):
+    # Targeted LLM fix: the fixer gets the remaining validator errors, not just the XML.
+    # The first repair goes to the fast tier; if its output still fails validation the next one escalates.
+    # Styles go out as names (verify_code_node expands them again when the answer comes back).
+    chain = registry.get_chain("verify", tier=state.repair_attempts)
+    state.repair_attempts += 1
     try:
-        result = chain.invoke({"input": state.xml_code})
+        result = await chain.ainvoke({"input": compact_styles(state.xml_code), "errors": "\n".join(f"- {e}" for e in state.validation_errors)})
         state.xml_code = result.content if hasattr(result, "content") else str(result)
     except Exception as e:
-        print(f"Error in verify_code_node: {e}")
-        state.xml_code = None
+        metrics.node_error("repair_code", e)
     return state
 
-graph_builder.add_node("generate_plan", generate_plan_node)
-graph_builder.add_node("generate_code", generate_code_node)
-graph_builder.add_node("verify_code", verify_code_node)
+def build_graph():
+    # langgraph is imported here rather than at module load: it is the largest import after
+    # the MCP stack, and keeping it off the import path lets a cold container listen sooner.
+    from langgraph.graph import StateGraph, START, END
+
+    graph_builder = StateGraph(WorkflowState)
+    graph_builder.add_node("generate_plan", generate_plan_node)
+    graph_builder.add_node("generate_code", generate_code_node)
+    graph_builder.add_node("verify_code", verify_code_node)
+    graph_builder.add_node("repair_code", repair_code_node)
+
+    graph_builder.add_conditional_edges(START, route_start, ["generate_plan", "generate_code"])
+    graph_builder.add_edge("generate_plan", "generate_code")
+    graph_builder.add_edge("generate_code", "verify_code")
+    graph_builder.add_conditional_edges("verify_code", route_verify, {"repair": "repair_code", "done": END})
+    graph_builder.add_edge("repair_code", "verify_code")
+    return graph_builder
+
+
+def warm_up():
+    # Runs on a daemon thread from __main__. Only imports and builds what the first request
+    # would; the checkpointer itself is opened on the server's event loop, as before.
+    start = time.perf_counter()
+    try:
+        build_graph()
+        checkpoint.preload()
+        registry.warm()
+    except Exception as e:
+        metrics.log("warm_up_failed", logging.WARNING, error=str(e))
+    else:
+        metrics.log("warm_up", seconds=round(time.perf_counter() - start, 3))
+
+# How a tool hands the diagram back, on top of the stored artifact's URI (and path, for
+# stores backed by files): "resource" adds nothing, "inline" adds the XML and "deflate" adds
+# it compressed the way draw.io compresses <diagram> payloads (decompress_diagram reverses it).
+OUTPUT_MODES = ("resource", "inline", "deflate")
+
+# `fmt` "drawio" stores the diagram only; "svg" and "png" also export it (pipeline/export.py).
+# An export that fails is reported as export_error next to the stored diagram.
+def output_error(output, fmt="drawio"):
+    if output not in OUTPUT_MODES:
+        return {"error": f"Unknown output {output!r}; expected one of {', '.join(OUTPUT_MODES)}"}
+    if fmt != "drawio" and fmt not in EXPORT_FORMATS:
+        return {"error": f"Unknown fmt {fmt!r}; expected drawio or one of {', '.join(EXPORT_FORMATS)}"}
+    return None
+
+async def store_diagram(trace, name, xml_content, output, fmt="drawio"):
+    try:
+        artifact = await artifacts.get_store().put(name, xml_content)
+    except Exception as e:
+        trace.status = "error"
+        trace.errors.append(f"write: {e}")
+        return {"error": f"Failed to store .drawio file: {e}"}
+    result = artifact.describe()
+    if output == "inline":
+        result["xml"] = xml_content
+    elif output == "deflate":
+        result["xml_deflate"] = compress_chunks([xml_content])
+    if fmt != "drawio":
+        try:
+            export = await exporter.export(xml_content, fmt)
+        except Exception as e:
+            metrics.log("export_failed", logging.WARNING, fmt=fmt, error=str(e))
+            result["export_error"] = str(e)
+            return result
+        result["export"] = export.describe()
+        if output == "inline":
+            result["export"]["data"] = export.data.decode("utf-8") if fmt == "svg" else base64.b64encode(export.data).decode("ascii")
+    return result
 
-graph_builder.add_edge(START, "generate_plan")
-graph_builder.add_edge("generate_plan", "generate_code")
-graph_builder.add_edge("generate_code", "verify_code")
-graph_builder.add_edge("verify_code", END)
+async def run_pipeline(input, filename, use_cache=True, progress=None, reserved=False, output="resource", fmt="drawio"):
+    # One trace per call: node timings, token usage and outcome end up in a single JSON log line.
+    with metrics.trace_run(filename=filename) as trace:
+        return await _run_pipeline(trace, input, filename, use_cache, progress, reserved, output, fmt)
+
+async def _run_pipeline(trace, input, filename, use_cache, progress, reserved, output, fmt):
+    if error := output_error(output, fmt):
+        return error
+    xml_content = await result_cache.get("diagram", input) if use_cache else None
+    if not use_cache:
+        result_cache.bypassed += 1
+    if xml_content is not None:
+        trace.status = "cached"
+    else:
+        state = WorkflowState(user_prompt=input, use_cache=use_cache)
+        # Each call gets its own checkpoint thread so concurrent requests never share state.
+        config = {"configurable": {"thread_id": trace.run_id}, "callbacks": [trace]}
+        if progress is not None:
+            config["configurable"]["progress"] = progress
+        # Compiled once, on the first request, against the configured checkpoint store.
+        graph = registry.get_graph("generate_xml", build_graph, await checkpoint.get_checkpointer())
+        try:
+            async with limiter.slot(reserved=reserved):
+                result = await graph.ainvoke(state, config)
+        except QueueFullError as e:
+            trace.status = "rejected"
+            return {"error": f"Server busy, try again later: {e}"}
+
+        xml_content = result.get("xml_code") if result else None
+        errors = result.get("validation_errors") if result else None
+
+        if not xml_content or "<mx" not in xml_content:
+            trace.status = "invalid"
+            return {"error": "Generated XML is invalid or empty"}
+        if errors:
+            # The repair budget ran out: report what is still wrong, and neither store nor cache it.
+            trace.status = "invalid"
+            return {"error": "Generated XML is still invalid after repair", "validation_errors": errors}
+        if use_cache:
+            await result_cache.set("diagram", input, xml_content)
+    metrics.xml_size(xml_content)
+
+    return await store_diagram(trace, filename, xml_content, output, fmt)
 
 @mcp.tool()
+async def generate_xml(input: str, filename: str = "diagram.drawio", fmt: str = "drawio", use_cache: bool = True, output: str = "resource", ctx: Context = None) -> str:
+    progress = None
+    if ctx is not None:
+        # Stream each validated cell back as a progress notification for partial rendering.
+        # MCP progress must only increase, so count notifications rather than cells.
+        sent = 0
+
+        async def progress(update):
+            nonlocal sent
+            sent += 1
+            await ctx.report_progress(sent, None, json.dumps(update))
+    return json.dumps(await run_pipeline(input, filename, use_cache, progress, output=output, fmt=fmt))
+
 @mcp.tool()
-def generate_xml(input: str, filename: str = "diagram.drawio", fmt: str = "png") -> str:
-    state = WorkflowState(user_prompt=input)
-    config = {"configurable": {"thread_id": "1"}}
-    graph = graph_builder.compile(checkpointer=memory)
-    result = graph.invoke(state, config)
+async def generate_xml_batch(inputs: List[str], filename_prefix: str = "diagram", use_cache: bool = True, output: str = "resource", fmt: str = "drawio", ctx: Context = None) -> str:
+    # A bounded pool of workers drains the prompts; each finished diagram is reported as a
+    # progress notification straight away, and the final result lists them in completion order.
+    # The workers' places in the request queue are reserved up front: a batch that doesn't fit
+    # is rejected like any other request, and never waits outside the queue limit.
+    if len(inputs) > BATCH_MAX_INPUTS:
+        return json.dumps({"error": f"Batch too large: {len(inputs)} prompts, at most {BATCH_MAX_INPUTS}"})
+    queue = asyncio.Queue()
+    for index, prompt in enumerate(inputs):
+        queue.put_nowait((index, prompt))
+    results = []
+
+    async def worker():
+        while not queue.empty():
+            index, prompt = queue.get_nowait()
+            try:
+                result = await run_pipeline(prompt, f"{filename_prefix}_{index + 1}", use_cache, reserved=True, output=output, fmt=fmt)
+            except Exception as e:
+                metrics.log("batch_item_failed", logging.ERROR, index=index, error=str(e))
+                result = {"error": str(e)}
+            result.update(index=index, input=prompt)
+            results.append(result)
+            if ctx is not None:
+                await ctx.report_progress(len(results), len(inputs), json.dumps({"stage": "batch", **result}))
+
+    workers = min(BATCH_WORKERS, len(inputs), limiter.max_concurrency + limiter.max_queue)
+    try:
+        with limiter.reserve(workers):
+            await asyncio.gather(*(worker() for _ in range(workers)))
+    except QueueFullError as e:
+        return json.dumps({"error": f"Server busy, try again later: {e}"})
+    return json.dumps({"results": results})
+
+def resolve_diagram_path(path):
+    # Files are only ever read from ARTIFACT_DIR: relative paths are taken from there, and
+    # anything that resolves elsewhere (absolute paths, "..", symlinks out) is refused.
+    root = os.path.realpath(artifacts.ARTIFACT_DIR)
+    path = os.path.join(root, os.path.expanduser(path))
+    if not os.path.exists(path) and not path.endswith(".drawio"):
+        path += ".drawio"
+    path = os.path.realpath(path)
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"{path} is outside the artifact directory {root}")
+    return path
 
-    xml_content = result.get("xml_code") if result else None
+async def read_diagram(ref):
+    # Artifact URIs and bare ids/names come from the store; anything else, or a bare name the
+    # store doesn't have, is a file under ARTIFACT_DIR. Returns (file path or None, content).
+    if ref.startswith(artifacts.URI_PREFIX) or os.path.basename(ref) == ref:
+        content = await artifacts.get_store().get(artifacts.artifact_id(ref))
+        if content is not None:
+            return None, content
+    path = resolve_diagram_path(ref)
 
-    if not xml_content or "<mx" not in xml_content:
-        return json.dumps({"error": "Generated XML is invalid or empty"})
+    def read():
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    return path, await asyncio.to_thread(read)
 
-    if not filename.endswith(".drawio"):
-        filename += ".drawio"
+@metrics.instrument("edit_diagram")
+async def _edit_diagram(trace, path, change, filename, output, fmt):
+    if error := output_error(output, fmt):
+        return error
+    try:
+        source, original = await read_diagram(path)
+    except (OSError, ValueError) as e:
+        trace.status = "error"
+        return {"error": f"Failed to read .drawio file: {e}"}
 
-    drawio_path = os.path.expanduser(f"~/Downloads/{filename}")
+    # Normalise without renumbering so the ids in the summary are the ids in the file.
+    report = validate_and_repair(original, renumber=False)
+    if report.xml is None:
+        trace.status = "invalid"
+        return {"error": f"Could not parse {path}: {'; '.join(report.errors)}"}
+    model_attrs, cells = parse_diagram(report.xml)
+    summary = summarize(cells)
 
+    chain = registry.get_chain("edit")
+    config = {"callbacks": [trace], "metadata": {"node": "edit_diagram"}}
     try:
-        with open(drawio_path, "w", encoding="utf-8") as f:
-            f.write(xml_content)
+        async with limiter.slot():
+            result = await chain.ainvoke({"summary": summary, "change": change}, config)
+        patch = parse_patch(result.content if hasattr(result, "content") else str(result))
+        patched, counts = apply_patch(model_attrs, cells, patch)
+    except QueueFullError as e:
+        trace.status = "rejected"
+        return {"error": f"Server busy, try again later: {e}"}
     except Exception as e:
-        return json.dumps({"error": f"Failed to write .drawio file: {e}"})
+        metrics.node_error("edit_diagram", e)
+        trace.status = "error"
+        return {"error": f"Edit failed: {e}"}
+
+    final = validate_and_repair(patched, renumber=False)
+    metrics.validation("local" if final.ok else "unresolved", len(final.fixes))
+    if not final.ok:
+        trace.status = "invalid"
+        return {"error": f"Patched diagram is invalid: {'; '.join(final.errors)}"}
+    metrics.xml_size(final.xml)
+
+    # The edit is always a new artifact; the source diagram is never overwritten.
+    if not filename:
+        stem = os.path.splitext(os.path.basename(source) if source else artifacts.artifact_id(path))[0]
+        filename = f"{stem}_edit_{trace.run_id[:8]}"
+    result = await store_diagram(trace, filename, final.xml, output, fmt)
+    return {**result, **counts} if "error" not in result else result
+
+@mcp.tool()
+async def edit_diagram(path: str, change: str, filename: str = None, output: str = "resource", fmt: str = "drawio") -> str:
+    # Patch a stored artifact (URI or id) or a file under ARTIFACT_DIR: the LLM only sees a
+    # compact summary and answers with the delta, so existing ids and layout are preserved.
+    # The result is stored as a new artifact, named `filename` or after the source.
+    with metrics.trace_run(filename=filename or path) as trace:
+        return json.dumps(await _edit_diagram(trace, path, change, filename, output, fmt))
+
+@mcp.resource(artifacts.URI_PREFIX + "{artifact_id}", mime_type="application/xml")
+async def diagram_artifact(artifact_id: str) -> str:
+    # Stored diagrams for clients that don't share the server's filesystem.
+    content = await artifacts.get_store().get(artifact_id)
+    if content is None:
+        raise ValueError(f"No stored diagram {artifact_id!r}")
+    return content
 
-    return json.dumps({
-        "drawio_path": drawio_path
+async def _exported(name):
+    export = await exporter.get(name)
+    if export is None:
+        raise ValueError(f"No export {name!r}; exports are cached, so export the diagram again")
+    return export.data
+
+@mcp.resource(EXPORT_URI_PREFIX + "{sha256}.svg", mime_type="image/svg+xml")
+async def svg_export(sha256: str) -> str:
+    return (await _exported(f"{sha256}.svg")).decode("utf-8")
+
+@mcp.resource(EXPORT_URI_PREFIX + "{sha256}.png", mime_type="image/png")
+async def png_export(sha256: str) -> bytes:
+    return await _exported(f"{sha256}.png")
+
+@mcp.tool()
+async def token_report() -> str:
+    # Prompt tokens per node: each stage's static prompt size and cacheable prefix, plus the
+    # prompt, cached and completion tokens providers have reported since startup.
+    return json.dumps(tokens.report())
+
+@mcp.custom_route("/stats", methods=["GET"])
+async def stats(request):
+    # ru_maxrss is in KiB on Linux; peak RSS is what the container limit has to cover.
+    return JSONResponse({
+        "checkpoints": checkpoint.stats(),
+        "result_cache": result_cache.stats(),
+        "code_stream": stream_stats.stats(),
+        "artifacts": artifacts.get_store().stats(),
+        "exports": exporter.stats(),
+        "tokens": tokens.usage(),
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "requests_in_flight": limiter.pending,
     })
 
+metrics.gauge("drawio_requests_in_flight", "Requests running or queued.", lambda: limiter.pending)
+metrics.gauge("drawio_result_cache_hit_rate", "Hit rate of the prompt-keyed result cache.", lambda: result_cache.stats()["hit_rate"])
+metrics.gauge("drawio_checkpoint_threads", "Checkpoint threads currently held.", lambda: checkpoint.stats().get("threads"))
+metrics.gauge("drawio_max_rss_bytes", "Peak resident set size of the server.", lambda: resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request):
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # The HTTP app's lifespan runs once per process (FastMCP's own lifespan runs per MCP
+    # session): start the session manager as FastMCP does, and close the checkpoint store's
+    # connection on shutdown so an open sqlite store can't keep the interpreter alive.
+    try:
+        async with mcp.session_manager.run():
+            yield
+    finally:
+        await checkpoint.close()
+
+def serve():
+    # What mcp.run(transport="streamable-http") does, with the lifespan above.
+    import uvicorn
+    app = mcp.streamable_http_app()
+    app.router.lifespan_context = lifespan
+    uvicorn.run(app, host=mcp.settings.host, port=mcp.settings.port, log_level=mcp.settings.log_level.lower())
+
 if __name__ == "__main__":
-    
-    mcp.run(transport="streamable-http",mount_path="/mcp")
+    if WARM_UP:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    serve()
 